@@ -0,0 +1,25 @@
+"""
+可选加速构建 — 用 mypyc 把热路径模块编译为 C 扩展。
+
+message_utils 的归一化/指纹函数每个 OCR 帧都会执行多次，纯解释执行
+开销明显。本脚本不是安装入口，只用于本地生成加速扩展：
+
+    pip install mypy
+    python setup.py build_ext --inplace
+
+编译产物（.pyd/.so）会覆盖同名 .py 的导入；未编译时自动回退纯 Python。
+"""
+from setuptools import setup
+
+try:
+    from mypyc.build import mypycify
+    ext_modules = mypycify(["src/message_utils.py"])
+except ImportError:
+    print("mypy 未安装，跳过 mypyc 编译（运行时使用纯 Python 实现）")
+    ext_modules = []
+
+setup(
+    name="pry-accel",
+    version="0.1",
+    ext_modules=ext_modules,
+)
@@ -5,20 +5,35 @@ LLM 客户端模块 — 连接豆包/DeepSeek，分析聊天上下文并返回
 import json
 import logging
 import os
-import re
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+try:
+    import orjson
+except ImportError:  # 环境无 orjson 时回退标准库
+    orjson = None
 
 from dotenv import load_dotenv
 from openai import OpenAI
 
 try:
     from .personality import PersonalityEngine
+    from .message_utils import Msg, fingerprint_messages
 except ImportError:
     from personality import PersonalityEngine
+    from message_utils import Msg, fingerprint_messages
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
-VALID_ACTIONS = {"suggest", "roast", "think", "vibe", "warn", "none"}
+# 常量动作集合：frozenset + intern 让成员判断走指针相等的快路径
+VALID_ACTIONS = frozenset(
+    map(sys.intern, ("suggest", "roast", "think", "vibe", "warn", "none")))
+
+# analyze_chat 结果缓存上限（LRU）
+_CACHE_MAXSIZE = 256
 
 
 class LLMClient:
@@ -52,6 +67,17 @@ class LLMClient:
         
         self.personality = PersonalityEngine()
 
+        # 结果缓存：同一联系人 + 同一消息指纹不重复请求远端
+        self._result_cache: OrderedDict = OrderedDict()
+
+        # 单线程后台执行器：人格簿记与上下文格式化/网络等待重叠，
+        # 串行执行保证情绪/静默计数的更新顺序
+        self._bg = ThreadPoolExecutor(max_workers=1)
+
+        # 人格描述缓存：状态签名不变时复用上次格式化结果
+        self._pp_cache_key = None
+        self._pp_cache_val = ""
+
     @staticmethod
     def _extract_json_block(text: str) -> str:
         if not text:
@@ -71,29 +97,38 @@ class LLMClient:
             return cleaned
 
         # Fallback: find first balanced JSON object.
+        # State machine tracks string/escape state so that braces inside
+        # string values (e.g. a "}" in the content field) don't miscount.
         start = cleaned.find("{")
         if start < 0:
             return ""
 
         depth = 0
-        for idx, ch in enumerate(cleaned[start:], start=start):
-            if ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    return cleaned[start: idx + 1]
-
-        # Last chance: a permissive regex block (for malformed wrappers).
-        match = re.search(r"\{[\s\S]*\}", cleaned)
-        return match.group(0) if match else ""
+        in_str = False
+        esc = False
+        for idx in range(start, len(cleaned)):
+            ch = cleaned[idx]
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = in_str
+            elif ch == '"':
+                in_str = not in_str
+            elif not in_str:
+                if ch == "{":
+                    depth += 1
+                elif ch == "}":
+                    depth -= 1
+                    if depth == 0:
+                        return cleaned[start: idx + 1]
+        return ""
 
     @staticmethod
     def _normalize_result(parsed: dict) -> dict:
         if not isinstance(parsed, dict):
             return {"action": "none", "content": "", "memory_updates": {}}
 
-        action = str(parsed.get("action", "none")).lower().strip()
+        action = sys.intern(str(parsed.get("action", "none")).lower().strip())
         if action not in VALID_ACTIONS:
             action = "none"
 
@@ -122,19 +157,44 @@ class LLMClient:
             "memory_updates": normalized_updates,
         }
 
+    @staticmethod
+    def _peek_action(buf: str):
+        """
+        在流式累积的半截 JSON 中尽早提取 action 字段的值。
+        action 值是固定枚举（无转义字符），简单引号定位即可；
+        字段尚未完整时返回 None。
+        """
+        key = buf.find('"action"')
+        if key < 0:
+            return None
+        colon = buf.find(':', key + 8)
+        if colon < 0:
+            return None
+        q1 = buf.find('"', colon + 1)
+        if q1 < 0:
+            return None
+        q2 = buf.find('"', q1 + 1)
+        if q2 < 0:
+            return None
+        return buf[q1 + 1:q2]
+
     @classmethod
     def parse_response_text(cls, result_text: str) -> dict | None:
         json_block = cls._extract_json_block(result_text)
         if not json_block:
             return None
-        parsed = json.loads(json_block)
+        if orjson is not None:
+            parsed = orjson.loads(json_block)
+        else:
+            parsed = json.loads(json_block)
         return cls._normalize_result(parsed)
 
     def analyze_chat(self, chat_history, contact_name: str = None, memory_context: str = ""):
         """
         分析聊天上下文，返回建议和记忆更新。
 
-        :param chat_history: 消息列表 [{"role": "Self"/"Other", "text": "..."}]
+        :param chat_history: 消息列表，元素为 message_utils.Msg
+                             或 {"role": "Self"/"Other", "text": "..."} 字典
         :param contact_name: 当前聊天对象名称（OCR 识别）
         :param memory_context: 记忆系统提供的上下文字符串
         :return: {
@@ -149,27 +209,47 @@ class LLMClient:
         if not self.client or not chat_history:
             return None
 
-        # 格式化消息上下文
-        context_str = ""
+        # 结果缓存：同一联系人 + 同一消息指纹直接复用上次解析结果，
+        # 把 500-2000ms 的远端调用换成一次字典查找。
+        cache_key = (contact_name, fingerprint_messages(chat_history))
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            self._result_cache.move_to_end(cache_key)
+            logger.debug(f"LLM 结果缓存命中: {cache_key}")
+            return cached
+
+        # 人格簿记（更新情绪 + 自发性决策）丢到后台线程，
+        # 与下面的消息上下文格式化并行
+        personality_future = self._bg.submit(
+            self._prepare_personality, list(chat_history))
+
+        # 格式化消息上下文（碎片列表 + join，避免循环内字符串重分配）
+        parts = []
         if contact_name:
-            context_str += f"当前聊天对象: {contact_name}\n\n"
+            parts.append(f"当前聊天对象: {contact_name}\n\n")
 
-        for msg in chat_history[-10:]:
-            label = msg['role']
-            if contact_name and msg['role'] == "Other":
-                label = contact_name
-            context_str += f"{label}: {msg['text']}\n"
+        # 列表直接负向切片；deque 等序列用 islice 避免整体拷贝
+        if isinstance(chat_history, list):
+            recent = chat_history[-10:]
+        else:
+            recent = islice(chat_history, max(0, len(chat_history) - 10), None)
 
-        # 更新情绪
-        self.personality.update_mood(chat_history)
-        
-        # 决定是否强制触发某种 Action (自发性)
-        forced_action = self.personality.decide_spontaneous_action(chat_history)
+        for msg in recent:
+            role = msg.role if isinstance(msg, Msg) else msg['role']
+            text = msg.text if isinstance(msg, Msg) else msg['text']
+            label = contact_name if (contact_name and role == "Other") else role
+            parts.append(f"{label}: {text}\n")
+        context_str = "".join(parts)
+
+        forced_action = personality_future.result()
 
         # 构建 System Prompt
         system_prompt = self._build_system_prompt(memory_context, forced_action)
 
+        result_text = ""
         try:
+            # 流式接收：边收边扫 action 字段，"none" 直接提前断流，
+            # 不等 content/memory_updates 生成完
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
@@ -178,17 +258,46 @@ class LLMClient:
                 ],
                 temperature=0.7,
                 timeout=30,
+                stream=True,
             )
 
-            result_text = response.choices[0].message.content
+            action_seen = None
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if not delta:
+                    continue
+                result_text += delta
+                if action_seen is None:
+                    action_seen = self._peek_action(result_text)
+                    if action_seen == "none":
+                        break
+
+            if action_seen == "none":
+                # 提前断流是常态路径（噪声对话都走这里），显式关闭
+                # 响应归还连接，不能靠 GC 收走挂着的 HTTP 流
+                try:
+                    response.close()
+                except Exception:
+                    pass
+                self._bg.submit(self.personality.tick_silent, True)
+                logger.debug("LLM 响应: action=none (提前断流)")
+                return {"action": "none", "content": "", "memory_updates": {}}
+
             parsed = self.parse_response_text(result_text)
             if not parsed:
                 logger.warning(f"LLM 返回非 JSON: {str(result_text)[:200]}...")
                 return None
             
-            # 更新静默计数器
-            self.personality.tick_silent(parsed.get("action") == "none")
-            
+            # 更新静默计数器（后台执行，不占响应路径）
+            self._bg.submit(
+                self.personality.tick_silent, parsed.get("action") == "none")
+
+            self._result_cache[cache_key] = parsed
+            if len(self._result_cache) > _CACHE_MAXSIZE:
+                self._result_cache.popitem(last=False)
+
             logger.debug(f"LLM 响应: {parsed}")
             return parsed
 
@@ -199,12 +308,14 @@ class LLMClient:
             logger.error(f"LLM 调用失败 ({self.provider}): {e}")
             return None
 
-    def _build_system_prompt(self, memory_context: str = "", forced_action: str = None) -> str:
-        """构建包含记忆上下文和人格注入的 System Prompt"""
-
-        personality_info = self.personality.get_personality_prompt()
+    def _prepare_personality(self, chat_history):
+        """更新情绪并决定自发性动作（在后台执行器中运行）"""
+        self.personality.update_mood(chat_history)
+        return self.personality.decide_spontaneous_action(chat_history)
 
-        base_prompt = f"""你是 Pry，一个有个性的社交辅助 AI，用户的毒舌隐形伙伴。
+    # System Prompt 固定骨架：常量文本只在类加载时组装一次，
+    # 每次调用仅填充三个可变槽位（JSON 示例中的字面大括号已转义）
+    _PROMPT_TEMPLATE = """你是 Pry，一个有个性的社交辅助 AI，用户的毒舌隐形伙伴。
 你在后台默默监控聊天（"Self" 是用户，"Other" 是对方），根据你的性格和当前情绪进行输出。
 
 ## 你的人格信息
@@ -224,26 +335,37 @@ class LLMClient:
    - 对于有语义的消息（哪怕只是一个“好”字），如果你觉得值得吐槽或建议，请正常输出。
    - 如果消息明显是 OCR 错误（如“✕”、“一”、“登录”等来自 UI 的单字）或缺乏任何基本语义，输出 none。
 3. 对于正常对话，**禁止输出 none**，必须从 suggest/roast/think/vibe/warn 中选择一个。
-"""
-        if forced_action:
-            base_prompt += f"\n**当前你必须执行一次 {forced_action} 操作，绝对禁止输出 none！这是强制指令。**\n"
-
-        base_prompt += """
+{forced_block}
 ## 输出格式 (严格纯 JSON)
-{
+{{
   "action": "suggest" | "roast" | "think" | "vibe" | "warn" | "none",
   "content": "你要说的话（如果是 suggest，则是建议回复内容；如果是 roast/think/vibe，则是你的吐槽或想法；如果 none 则为空字符串）",
-  "memory_updates": {
-    "contact": {"relationship": "关系更新", "notes": "关键观察"},
-    "user": {"communication_style": "沟通风格观察"}
-  }
-}
-"""
-
-        if memory_context:
-            base_prompt += f"\n## 已知记忆\n{memory_context}\n"
+  "memory_updates": {{
+    "contact": {{"relationship": "关系更新", "notes": "关键观察"}},
+    "user": {{"communication_style": "沟通风格观察"}}
+  }}
+}}
+{memory_block}"""
 
-        return base_prompt
+    def _build_system_prompt(self, memory_context: str = "", forced_action: str = None) -> str:
+        """构建包含记忆上下文和人格注入的 System Prompt"""
+        forced_block = (
+            f"\n**当前你必须执行一次 {forced_action} 操作，绝对禁止输出 none！这是强制指令。**\n"
+            if forced_action else ""
+        )
+        memory_block = f"\n## 已知记忆\n{memory_context}\n" if memory_context else ""
+
+        # 情绪/静默状态没变时直接复用上次的人格描述
+        key = self.personality.state_signature()
+        if key != self._pp_cache_key:
+            self._pp_cache_val = self.personality.get_personality_prompt()
+            self._pp_cache_key = key
+
+        return self._PROMPT_TEMPLATE.format(
+            personality_info=self._pp_cache_val,
+            forced_block=forced_block,
+            memory_block=memory_block,
+        )
 
 
 if __name__ == "__main__":
@@ -1,45 +1,152 @@
 """
-长期记忆存储模块 — 基于JSON文件的轻量级记忆系统
+长期记忆存储模块 — 基于 SQLite (WAL) 的轻量级记忆系统
 存储联系人画像、关系推断和用户社交风格等信息。
+每次更新只写脏行（B-tree 单行 upsert），不再全量重写整个记忆文件。
 """
+import atexit
+import bisect
 import json
 import logging
 import os
+import sqlite3
 import threading
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # 环境无 orjson 时回退标准库
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
-# 默认记忆文件路径
-DEFAULT_MEMORY_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "memory.json")
+# 默认记忆数据库路径（旧版 JSON 文件首次启动时自动迁移）
+DEFAULT_MEMORY_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "memory.db")
+LEGACY_JSON_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "memory.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    name TEXT PRIMARY KEY,
+    json TEXT NOT NULL,
+    last_seen TEXT,
+    count INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS user_profile (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _loads(raw):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
 
 
 class MemoryStore:
-    """JSON文件记忆存储"""
+    """SQLite 记忆存储（内存字典 + 脏行落盘）"""
 
     def __init__(self, memory_path: str = None):
         self.memory_path = memory_path or DEFAULT_MEMORY_PATH
         self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(self.memory_path), exist_ok=True)
+        # autocommit 模式 + 显式 BEGIN/COMMIT 批量写；连接跨线程使用由 _lock 串行化
+        self._conn = sqlite3.connect(
+            self.memory_path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        # 脏行跟踪：flush 只 upsert 变化过的联系人/画像
+        self._dirty_contacts: set = set()
+        self._profile_dirty = False
+        self._meta_dirty = False
+
         self._data = self._load()
 
-    # ========== 文件 I/O ==========
+        # 仅内存态：按 notes 字段缓存已见片段，避免每次在 500 字符
+        # 大块字符串上做子串扫描。key 形如 ("contact", name) / ("user",)
+        self._notes_seen: dict[tuple, set] = {}
+
+        # 延迟落盘：脏标记 + 定时器合并突发更新，避免每次更新都写盘
+        self._dirty = False
+        self._flush_timer = None
+        atexit.register(self.flush)
+
+    # ========== 存储 I/O ==========
 
     def _load(self) -> dict:
-        """从文件加载记忆"""
-        if os.path.exists(self.memory_path):
-            try:
-                with open(self.memory_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                if not isinstance(data, dict):
-                    raise ValueError("memory data is not a JSON object")
-                logger.info(f"已加载记忆文件: {self.memory_path} "
-                            f"({len(data.get('contacts', {}))} 个联系人)")
-                return data
-            except (ValueError, json.JSONDecodeError, IOError) as e:
-                logger.error(f"记忆文件读取失败: {e}")
-
-        # 初始化空记忆
-        return self._default_data()
+        """从数据库加载记忆；空库时尝试迁移旧版 JSON 文件"""
+        try:
+            contacts = {
+                name: _loads(blob)
+                for name, blob in self._conn.execute("SELECT name, json FROM contacts")
+            }
+            profile = {
+                key: _loads(value)
+                for key, value in self._conn.execute("SELECT key, value FROM user_profile")
+            }
+            meta = {
+                key: _loads(value)
+                for key, value in self._conn.execute("SELECT key, value FROM meta")
+            }
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"记忆数据库读取失败: {e}")
+            return self._default_data()
+
+        if not contacts and not profile:
+            migrated = self._migrate_legacy_json()
+            if migrated is not None:
+                return migrated
+            return self._default_data()
+
+        data = self._default_data()
+        data["contacts"] = contacts
+        data["user_profile"].update(profile)
+        if meta:
+            data["meta"] = meta
+        logger.info(f"已加载记忆数据库: {self.memory_path} "
+                    f"({len(contacts)} 个联系人)")
+        return data
+
+    def _migrate_legacy_json(self):
+        """旧版 memory.json 存在时一次性导入数据库"""
+        legacy_path = LEGACY_JSON_PATH if self.memory_path == DEFAULT_MEMORY_PATH \
+            else os.path.splitext(self.memory_path)[0] + ".json"
+        if legacy_path == self.memory_path or not os.path.exists(legacy_path):
+            return None
+
+        try:
+            with open(legacy_path, 'rb') as f:
+                data = _loads(f.read())
+            if not isinstance(data, dict):
+                raise ValueError("memory data is not a JSON object")
+        except (ValueError, IOError) as e:
+            logger.error(f"旧版记忆文件迁移失败: {e}")
+            return None
+
+        merged = self._default_data()
+        merged["contacts"] = data.get("contacts", {}) or {}
+        merged["user_profile"].update(data.get("user_profile", {}) or {})
+        if data.get("meta"):
+            merged["meta"] = data["meta"]
+
+        self._dirty_contacts.update(merged["contacts"])
+        self._profile_dirty = True
+        self._meta_dirty = True
+        self._data = merged
+        self._flush()
+        logger.info(f"旧版记忆文件已迁移到数据库: {legacy_path} -> {self.memory_path}")
+        return merged
 
     def _default_data(self) -> dict:
         return {
@@ -52,27 +159,124 @@ class MemoryStore:
             "contacts": {},
             "meta": {
                 "created_at": datetime.now().isoformat(),
-                "version": "1.0"
+                "version": "2.0"
             }
         }
 
-    def save(self):
-        """持久化记忆到文件"""
-        os.makedirs(os.path.dirname(self.memory_path), exist_ok=True)
-        tmp_path = f"{self.memory_path}.tmp"
-        try:
-            with self._lock:
-                with open(tmp_path, 'w', encoding='utf-8') as f:
-                    json.dump(self._data, f, ensure_ascii=False, indent=2)
-                os.replace(tmp_path, self.memory_path)
-            logger.debug("记忆已保存")
-        except OSError as e:
-            logger.error(f"记忆保存失败: {e}")
+    def save(self, delay: float = 2.0):
+        """
+        标记记忆为脏并调度延迟落盘。
+        同一窗口期内的多次更新合并为一次数据库事务；delay<=0 立即落盘。
+        """
+        with self._lock:
+            self._dirty = True
+            if delay <= 0:
+                pass  # 立即落盘，下面调用 flush
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(delay, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+                return
+            else:
+                return
+        self.flush()
+
+    def flush(self):
+        """若有未落盘的更新则立即写入数据库"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._flush()
+
+    def _flush(self):
+        """把脏行写入数据库（单事务批量 upsert）"""
+        with self._lock:
+            contact_rows = []
+            contacts = self._data.get("contacts", {})
+            for name in self._dirty_contacts:
+                contact = contacts.get(name)
+                if contact is not None:
+                    contact_rows.append((
+                        name,
+                        _dumps(contact),
+                        contact.get("last_seen", ""),
+                        contact.get("interaction_count", 0),
+                    ))
+            self._dirty_contacts.clear()
+
+            profile_rows = None
+            if self._profile_dirty:
+                profile_rows = [
+                    (key, _dumps(value))
+                    for key, value in self._data.get("user_profile", {}).items()
+                ]
+                self._profile_dirty = False
+
+            meta_rows = None
+            if self._meta_dirty:
+                meta_rows = [
+                    (key, _dumps(value))
+                    for key, value in self._data.get("meta", {}).items()
+                ]
+                self._meta_dirty = False
+
+            if not contact_rows and profile_rows is None and meta_rows is None:
+                return
+
             try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-            except OSError:
-                pass
+                self._conn.execute("BEGIN")
+                if contact_rows:
+                    self._conn.executemany(
+                        "INSERT INTO contacts(name, json, last_seen, count) "
+                        "VALUES(?, ?, ?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET json=excluded.json, "
+                        "last_seen=excluded.last_seen, count=excluded.count",
+                        contact_rows)
+                if profile_rows:
+                    self._conn.executemany(
+                        "INSERT INTO user_profile(key, value) VALUES(?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                        profile_rows)
+                if meta_rows:
+                    self._conn.executemany(
+                        "INSERT INTO meta(key, value) VALUES(?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                        meta_rows)
+                self._conn.execute("COMMIT")
+                logger.debug("记忆已保存")
+            except sqlite3.Error as e:
+                logger.error(f"记忆保存失败: {e}")
+                try:
+                    self._conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+
+    # ========== 合并辅助 ==========
+
+    def _merge_note(self, cache_key: tuple, existing: str, value: str):
+        """
+        追加式合并 notes 类字段，返回合并后的字符串；重复内容返回 None。
+        已见片段缓存在内存 set 中，重复更新走 O(1) 查找而非子串扫描。
+        """
+        seen = self._notes_seen.get(cache_key)
+        if seen is None:
+            seen = set(existing.split("; ")) if existing else set()
+            self._notes_seen[cache_key] = seen
+
+        if value in seen:
+            return None
+        if existing and value in existing:
+            # 旧数据中作为子串出现过（如被截断过的长备注）
+            seen.add(value)
+            return None
+
+        seen.add(value)
+        merged = f"{existing}; {value}" if existing else value
+        return merged[:500]
 
     # ========== 联系人操作 ==========
 
@@ -90,10 +294,11 @@ class MemoryStore:
             return
 
         with self._lock:
+            now = datetime.now().isoformat()
             contacts = self._data.setdefault("contacts", {})
             if name not in contacts:
                 contacts[name] = {
-                    "first_seen": datetime.now().isoformat(),
+                    "first_seen": now,
                     "interaction_count": 0
                 }
 
@@ -103,15 +308,16 @@ class MemoryStore:
             for key, value in info.items():
                 if key == "notes" and key in contact and value:
                     # notes 追加而非覆盖（避免丢失历史记录）
-                    existing = contact.get("notes", "")
-                    if value not in existing:
-                        merged = f"{existing}; {value}" if existing else value
-                        contact["notes"] = merged[:500]
+                    merged = self._merge_note(
+                        ("contact", name), contact.get("notes", ""), value)
+                    if merged is not None:
+                        contact["notes"] = merged
                 elif value:  # 非空值才更新
                     contact[key] = value
 
-            contact["last_seen"] = datetime.now().isoformat()
+            contact["last_seen"] = now
             contact["interaction_count"] = contact.get("interaction_count", 0) + 1
+            self._dirty_contacts.add(name)
 
             logger.info(f"联系人记忆已更新: {name} -> {contact}")
         self.save()
@@ -136,19 +342,24 @@ class MemoryStore:
 
             for key, value in info.items():
                 if key == "common_topics" and isinstance(value, list):
-                    # 话题列表：合并去重
-                    existing = set(profile.get("common_topics", []))
-                    existing.update(v for v in value if v)
-                    profile["common_topics"] = sorted(existing)
+                    # 话题列表始终有序：新话题用 bisect 插入，
+                    # 无新增时完全跳过排序和重建
+                    topics = profile.setdefault("common_topics", [])
+                    seen = set(topics)
+                    for v in value:
+                        if v and v not in seen:
+                            bisect.insort(topics, v)
+                            seen.add(v)
                 elif key == "personality_notes" and key in profile and value:
-                    existing = profile.get("personality_notes", "")
-                    if value not in existing:
-                        merged = f"{existing}; {value}" if existing else value
-                        profile["personality_notes"] = merged[:500]
+                    merged = self._merge_note(
+                        ("user",), profile.get("personality_notes", ""), value)
+                    if merged is not None:
+                        profile["personality_notes"] = merged
                 elif value:
                     profile[key] = value
 
             profile["updated_at"] = datetime.now().isoformat()
+            self._profile_dirty = True
 
             logger.info(f"用户画像已更新: {profile}")
         self.save()
@@ -231,4 +442,4 @@ if __name__ == "__main__":
     print("=== LLM 上下文 ===")
     print(ctx)
 
-    print(f"\n记忆文件位置: {store.memory_path}")
+    print(f"\n记忆数据库位置: {store.memory_path}")
@@ -5,12 +5,34 @@ computing stable fingerprints for deduplication.
 from __future__ import annotations
 
 import hashlib
-import json
 import re
-from typing import Iterable
+import unicodedata
+from typing import Iterable, NamedTuple
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - 环境无 xxhash 时回退 blake2b
+    xxhash = None  # type: ignore[assignment]
+
+class Msg(NamedTuple):
+    """A normalized chat message: tuple allocation beats per-message dicts."""
+    role: str
+    text: str
+    conf: float
+
+    def to_dict(self) -> dict:
+        return {"role": self.role, "text": self.text, "conf": self.conf}
+
+
+# Precompiled: runs on every OCR fragment in the monitor loop,
+# so skip the re-module cache lookup on each call.
+_WS_RE = re.compile(r"\s+")
+
+# 零宽字符/BOM 删除表：单趟 translate 替代逐字符 replace 的多趟扫描
+_ZW_TABLE = {ord(c): None for c in "\u200b\u200c\u200d\u200e\u200f\ufeff"}
 
 # System fragments that often come from OCR noise rather than chat content.
-_UI_NOISE = {
+_UI_NOISE = frozenset({
     "微信",
     "qq",
     "搜索",
@@ -19,32 +41,67 @@ _UI_NOISE = {
     "最小化",
     "最大化",
     "聊天信息",
-}
+})
+_UI_NOISE_CF = frozenset(s.casefold() for s in _UI_NOISE)
 
 
 def normalize_text(text: str) -> str:
     if text is None:
         return ""
-    text = text.replace("\ufeff", "").replace("\u200b", "")
-    text = re.sub(r"\s+", " ", text)
+    text = text.translate(_ZW_TABLE)
+    text = _WS_RE.sub(" ", text)
     return text.strip()
 
 
 def is_semantic_message(text: str, min_len: int = 2) -> bool:
-    text = normalize_text(text)
+    return _is_semantic_normalized(normalize_text(text), min_len)
+
+
+def _is_semantic_normalized(text: str, min_len: int = 2) -> bool:
+    """同 is_semantic_message，但假定 text 已经过 normalize_text。"""
     if len(text) < min_len:
         return False
 
-    lower = text.lower()
-    if lower in _UI_NOISE:
+    # 先查原文（命中时零分配），未命中才付 casefold 的新串开销
+    if text in _UI_NOISE or text.casefold() in _UI_NOISE_CF:
         return False
 
-    has_cjk = bool(re.search(r"[\u4e00-\u9fff]", text))
-    has_word = bool(re.search(r"[A-Za-z]{2,}", text))
-    has_digits = bool(re.search(r"\d{3,}", text))
-    has_many_symbols = bool(re.fullmatch(r"[\W_]+", text))
-
-    if has_many_symbols:
+    # 单次遍历替代四个独立正则：对 5-50 字符的 OCR 片段只扫一遍字符串。
+    has_cjk = False
+    has_nonsymbol = False
+    letter_run = 0
+    digit_run = 0
+    has_word = False
+    has_digits = False
+    for ch in text:
+        code = ord(ch)
+        if 0x4E00 <= code <= 0x9FFF:
+            has_cjk = True
+            has_nonsymbol = True
+            letter_run = 0
+            digit_run = 0
+        elif ("a" <= ch <= "z") or ("A" <= ch <= "Z"):
+            letter_run += 1
+            if letter_run >= 2:
+                has_word = True
+            has_nonsymbol = True
+            digit_run = 0
+        # 只认十进制数字（Nd），与原 \d{3,} 一致；isdigit 会把
+        # 上标/带圈数字（²、①）也算进来，那些走下面的符号分支。
+        # ASCII 0-9 先短路掉，冷路径才查 unicodedata。
+        elif ch.isdigit() and (ch <= "9" or unicodedata.category(ch) == "Nd"):
+            digit_run += 1
+            if digit_run >= 3:
+                has_digits = True
+            has_nonsymbol = True
+            letter_run = 0
+        else:
+            if ch != "_" and ch.isalnum():
+                has_nonsymbol = True
+            letter_run = 0
+            digit_run = 0
+
+    if not has_nonsymbol:
         return False
 
     return has_cjk or has_word or has_digits
@@ -54,33 +111,51 @@ def normalize_messages(
     messages: Iterable[dict],
     min_len: int = 2,
     include_system: bool = False,
-) -> list[dict]:
-    cleaned: list[dict] = []
+) -> list[Msg]:
+    cleaned: list[Msg] = []
     for msg in messages or []:
         role = str(msg.get("role", "System"))
-        text = normalize_text(msg.get("text", ""))
-        conf = float(msg.get("conf", 0.0))
-
         if not include_system and role == "System":
             continue
-        if not is_semantic_message(text, min_len=min_len):
+
+        # 只归一化一次，语义判定直接复用归一化结果
+        text = normalize_text(msg.get("text", ""))
+        if not _is_semantic_normalized(text, min_len=min_len):
             continue
 
-        cleaned.append({
-            "role": role,
-            "text": text,
-            "conf": conf,
-        })
+        cleaned.append(Msg(role, text, float(msg.get("conf", 0.0))))
     return cleaned
 
 
-def fingerprint_messages(messages: Iterable[dict], limit: int = 20) -> str:
-    payload = [
-        {
-            "role": str(m.get("role", "")),
-            "text": normalize_text(str(m.get("text", ""))),
-        }
-        for m in list(messages or [])[-limit:]
-    ]
-    encoded = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
-    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+def _tail(messages: Iterable, limit: int) -> list:
+    """取最后 limit 条消息；序列类型直接切片，避免先整体拷贝一份。"""
+    if messages is None:
+        return []
+    if isinstance(messages, (list, tuple)):
+        return list(messages[-limit:])
+    items = list(messages)
+    return items[-limit:]
+
+
+def fingerprint_messages(messages: Iterable, limit: int = 20) -> bytes:
+    """
+    计算末尾 limit 条消息的稳定指纹。逐条把字节喂进哈希器
+    （role 与 text 之间/消息之间用控制字节分隔，避免歧义拼接），
+    不再构造 JSON 中间串；返回 digest bytes，比较比十六进制串更快。
+    指纹只做内容相等比较，非安全用途：优先 xxh3。
+    """
+    if xxhash is not None:
+        h = xxhash.xxh3_64()
+    else:
+        h = hashlib.blake2b(digest_size=8)
+    for m in _tail(messages, limit):
+        if isinstance(m, Msg):
+            role, text = m.role, m.text  # Msg.text 已归一化
+        else:
+            role = str(m.get("role", ""))
+            text = normalize_text(str(m.get("text", "")))
+        h.update(role.encode("utf-8"))
+        h.update(b"\x1f")
+        h.update(text.encode("utf-8"))
+        h.update(b"\x00")
+    return h.digest()
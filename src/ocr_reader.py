@@ -2,8 +2,13 @@
 OCR 阅读器模块 — 支持多平台（微信/QQ）的消息识别
 通过截屏 + RapidOCR 识别聊天内容、联系人名称和消息角色。
 """
+import atexit
+import hashlib
 import logging
+import os
+import queue
 import re
+import threading
 import time
 
 import cv2
@@ -15,14 +20,190 @@ import win32ui
 import ctypes
 from rapidocr_onnxruntime import RapidOCR
 
+try:
+    import dxcam  # DXGI Desktop Duplication，比 GDI BitBlt 快一个数量级
+except ImportError:
+    dxcam = None
+
+try:
+    from numba import njit  # 可选：合并扫描 JIT 成机器码
+except ImportError:
+    njit = None
+
 from platform_config import PlatformConfig, WECHAT_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# 标题栏过滤常量：每个 OCR tick 都会用到，编译/构造一次
+_CODE_PATTERN = re.compile(
+    r'[.](py|js|txt|md|bat|exe|json|csv|xml|html|cpp|java|go)'
+    r'|[\\/\>:]|\bsrc\b|\bdef\b|\bclass\b|\bimport\b'
+)
+_SYSTEM_WORDS = frozenset({"最小化", "最大化", "关闭", "—", "×", "□", "一", "X"})
+
+# 角色判定阈值（相对宽度）：左侧 Other / 右侧 Self / 中间 System
+_ROLE_BOUNDARY_LOW = 0.35
+_ROLE_BOUNDARY_HIGH = 0.65
+_ROLE_NAMES = ("Other", "Self", "System")
+
+# OCR 输入的目标高度：识别头只需要 ~32px 字高，高分屏 ROI 先降采样
+# 再推理，检测网络耗时近似随像素数线性下降
+_OCR_TARGET_HEIGHT = 900
+
+# DXGI 桌面复制相机（每个输出只允许一个实例，进程内共享）
+_DX_CAMERA = None
+_DX_FAILED = False
+
+
+class _BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ("biSize", ctypes.c_uint32),
+        ("biWidth", ctypes.c_int32),
+        ("biHeight", ctypes.c_int32),
+        ("biPlanes", ctypes.c_uint16),
+        ("biBitCount", ctypes.c_uint16),
+        ("biCompression", ctypes.c_uint32),
+        ("biSizeImage", ctypes.c_uint32),
+        ("biXPelsPerMeter", ctypes.c_int32),
+        ("biYPelsPerMeter", ctypes.c_int32),
+        ("biClrUsed", ctypes.c_uint32),
+        ("biClrImportant", ctypes.c_uint32),
+    ]
+
+
+class _BITMAPINFO(ctypes.Structure):
+    _fields_ = [
+        ("bmiHeader", _BITMAPINFOHEADER),
+        ("bmiColors", ctypes.c_uint32 * 3),
+    ]
+
+
+def _create_dib_section(hdc, width, height):
+    """
+    创建顶向下 32 位 DIB section，像素内存直接映射为 ndarray。
+    BitBlt 之后无需 GetBitmapBits 拷贝，省掉每帧 w*h*4 字节的 memcpy。
+    :return: (HBITMAP, (h, w, 4) uint8 ndarray 视图)
+    """
+    gdi32 = ctypes.windll.gdi32
+    gdi32.CreateDIBSection.restype = ctypes.c_void_p
+
+    bmi = _BITMAPINFO()
+    bmi.bmiHeader.biSize = ctypes.sizeof(_BITMAPINFOHEADER)
+    bmi.bmiHeader.biWidth = width
+    bmi.bmiHeader.biHeight = -height  # 负高度 = 顶向下行序
+    bmi.bmiHeader.biPlanes = 1
+    bmi.bmiHeader.biBitCount = 32
+    bmi.bmiHeader.biCompression = 0  # BI_RGB
+
+    pbits = ctypes.c_void_p()
+    hbmp = gdi32.CreateDIBSection(
+        ctypes.c_void_p(hdc), ctypes.byref(bmi), 0,  # DIB_RGB_COLORS
+        ctypes.byref(pbits), None, 0)
+    if not hbmp or not pbits.value:
+        raise OSError("CreateDIBSection 失败")
+
+    arr = np.ctypeslib.as_array(
+        (ctypes.c_uint8 * (height * width * 4)).from_address(pbits.value)
+    ).reshape(height, width, 4)
+    return hbmp, arr
+
+
+def _get_dx_camera():
+    """懒初始化共享 DXcam 实例；初始化失败后不再重试"""
+    global _DX_CAMERA, _DX_FAILED
+    if _DX_CAMERA is None and not _DX_FAILED and dxcam is not None:
+        try:
+            _DX_CAMERA = dxcam.create(output_color="BGR")
+            logger.info("截图后端: DXGI Desktop Duplication (dxcam)")
+        except Exception as e:
+            _DX_FAILED = True
+            logger.warning(f"DXcam 初始化失败，回退 GDI BitBlt: {e}")
+    return _DX_CAMERA
+
+
+def _thumb_hash(img: np.ndarray) -> bytes:
+    """
+    缩略图指纹：32x8 下采样后 blake2b，用于判断区域像素是否变化。
+    远比整条 OCR 推理便宜（µs vs 数十 ms）。
+    """
+    thumb = cv2.resize(img, (32, 8), interpolation=cv2.INTER_AREA)
+    return hashlib.blake2b(thumb.tobytes(), digest_size=8).digest()
+
+
+def _smooth1d(x: np.ndarray, n: int) -> np.ndarray:
+    """
+    长度 n 的均匀滑动平均。cv2.blur 基于累积和，O(N) 且与核宽无关；
+    BORDER_CONSTANT 零填充与 np.convolve(mode='same') 的边界一致。
+    """
+    return cv2.blur(x.reshape(1, -1), (n, 1),
+                    borderType=cv2.BORDER_CONSTANT).ravel()
+
+
+def _row_order_stat(diff: np.ndarray, q: float) -> np.ndarray:
+    """
+    逐行取 q 分位的序统计量（np.partition，O(n) 选择而非全排序）。
+    在 uint8 差分图上替代 np.median / np.percentile 做行打分。
+    """
+    idx = min(diff.shape[1] - 1, int(diff.shape[1] * q))
+    return np.partition(diff, idx, axis=1)[:, idx].astype(np.float32)
+
+
+def _merge_group_ids(top_y, bot_y, roles):
+    """
+    按 1.5 倍行高规则给排序后的文本块分组，返回组号数组。
+    仅做类型化数组上的线性扫描，便于 numba 编译。
+    """
+    n = top_y.shape[0]
+    groups = np.empty(n, dtype=np.int32)
+    gid = 0
+    groups[0] = 0
+    cur_top = top_y[0]
+    cur_bot = bot_y[0]
+    cur_role = roles[0]
+    for i in range(1, n):
+        if roles[i] == cur_role:
+            line_h = cur_bot - cur_top
+            if top_y[i] - cur_bot < line_h * 1.5:
+                groups[i] = gid
+                cur_bot = bot_y[i]
+                continue
+        gid += 1
+        groups[i] = gid
+        cur_top = top_y[i]
+        cur_bot = bot_y[i]
+        cur_role = roles[i]
+    return groups
+
+
+if njit is not None:
+    _merge_group_ids = njit(cache=True)(_merge_group_ids)
+
 
 class AppReader:
     """通用IM应用阅读器，通过OCR识别聊天消息"""
 
+    # 进程级共享的 OCR 引擎：det/rec/cls 三个 ONNX 模型加载约 500ms，
+    # 平台切换重建 reader 时不再重复付这笔开销
+    _engine = None
+
+    @classmethod
+    def _get_engine(cls):
+        if cls._engine is None:
+            logger.info("正在初始化 RapidOCR 引擎...")
+            try:
+                cls._engine = RapidOCR(
+                    intra_op_num_threads=min(4, os.cpu_count() or 4))
+            except TypeError:
+                # 旧版本 wrapper 不暴露线程数参数
+                cls._engine = RapidOCR()
+            try:
+                # 预热：让图优化/内存池初始化发生在这里而不是首个 tick
+                cls._engine(np.zeros((32, 32, 3), dtype=np.uint8))
+            except Exception:
+                pass
+            logger.info("OCR 引擎就绪")
+        return cls._engine
+
     def __init__(self, config: PlatformConfig = None):
         """
         初始化阅读器
@@ -33,13 +214,46 @@ class AppReader:
         # 启用 DPI 感知（适配高分屏缩放）
         self.enable_high_dpi_awareness()
         
-        logger.info("正在初始化 RapidOCR 引擎...")
-        self.ocr_engine = RapidOCR()
-        logger.info("OCR 引擎就绪")
+        self.ocr_engine = self._get_engine()
 
         # 缓存布局参数
         self._layout_params = None
         self._last_window_rect = None
+        # 按窗口尺寸记忆布局：用户在阈值附近反复拖动时直接复用结果
+        self._layout_cache = {}
+
+        # 缓存命中的窗口句柄：避免每次调用都 EnumWindows 遍历全部顶层窗口
+        self._cached_hwnd = None
+        self._cached_class = None
+
+        # OCR 结果缓存：区域像素指纹不变时跳过整条 OCR 推理
+        self._last_title_hash = None
+        self._last_contact = None
+        self._last_chat_hash = None
+        self._last_messages = []
+
+        # GDI 兜底路径的内核对象缓存：按 (width, height) 复用 DC/位图，
+        # 避免每帧重建（每次创建约 1ms 的内核调用 + 驱动分配）
+        self._gdi_cache = {}
+        self._gdi_lock = threading.Lock()
+        atexit.register(self._release_gdi_cache)
+
+        # 输出帧缓冲池：按 (h, w, gray) 复用 ndarray，避免每帧多 MB 分配
+        self._frame_bufs = {}
+
+        # OCR 降采样输入的复用缓冲：窗口尺寸稳定时 resize 直接写进
+        # 上一帧的数组，省掉每次推理前的一次大分配
+        self._ocr_input_buf = None
+
+        # 后台抓帧线程：截图与 OCR 流水线化。按需唤醒——每次消费后
+        # 预取一帧与 OCR 重叠，无人消费时完全不抓（监控空闲退避期间
+        # 不再白抓整个 ROI）；首次请求截图时才启动线程，工具脚本里
+        # 只走同步接口的 AppReader 不会常驻抓帧线程
+        self._frame_queue = queue.Queue(maxsize=1)
+        self._grab_stop = threading.Event()
+        self._grab_wake = threading.Event()
+        self._grab_thread = None
+        self._grab_thread_lock = threading.Lock()
 
     @staticmethod
     def enable_high_dpi_awareness():
@@ -69,6 +283,22 @@ class AppReader:
         采用多重回退策略：类名+标题 -> 仅类名 -> 仅标题。
         :return: ((left, top, right, bottom), hwnd) 或 None
         """
+        # 快路径：上次命中的句柄仍有效就直接取 rect，免去整趟枚举
+        hwnd = self._cached_hwnd
+        if hwnd:
+            try:
+                if (win32gui.IsWindow(hwnd)
+                        and win32gui.IsWindowVisible(hwnd)
+                        and not win32gui.IsIconic(hwnd)
+                        and win32gui.GetClassName(hwnd) == self._cached_class):
+                    rect = win32gui.GetWindowRect(hwnd)
+                    if rect[2] - rect[0] > 200 and rect[3] - rect[1] > 200:
+                        return rect, hwnd
+            except Exception:
+                pass
+            self._cached_hwnd = None
+            self._cached_class = None
+
         candidates = []
         
         def check_hwnd(hwnd):
@@ -105,49 +335,95 @@ class AppReader:
         # 选面积最大的窗口
         candidates.sort(key=lambda x: x[0], reverse=True)
         _, rect, hwnd = candidates[0]
+        self._cached_hwnd = hwnd
+        try:
+            self._cached_class = win32gui.GetClassName(hwnd)
+        except Exception:
+            self._cached_class = None
         logger.debug(f"找到窗口: hwnd={hwnd}, rect={rect}, 候选数={len(candidates)}")
         return rect, hwnd
 
-    def capture_screen(self, region=None):
+    def capture_screen(self, region=None, gray=False):
         """
-        截取指定区域的屏幕截图（使用 BitBlt 高速截图）。
+        截取指定区域的屏幕截图。
+        优先 DXGI 桌面复制（GPU 已合成的帧，零额外拷贝），失败回退 GDI BitBlt。
         :param region: (left, top, width, height) 或 None 截全屏
-        :return: BGR numpy array 或 None
+        :param gray: True 时直接返回单通道灰度图（省掉 BGR 中间帧）
+        :return: BGR（或灰度）numpy array 或 None
+
+        注意：GDI 路径返回的数组是按尺寸复用的内部缓冲（类似 DXcam 的
+        grab_view 约定），下一次同尺寸截图会覆盖它；需要跨帧持有请自行 copy。
         """
-        try:
-            hwin = win32gui.GetDesktopWindow()
+        if region:
+            left, top, width, height = region
+        else:
+            width = win32api.GetSystemMetrics(win32con.SM_CXVIRTUALSCREEN)
+            height = win32api.GetSystemMetrics(win32con.SM_CYVIRTUALSCREEN)
+            left = win32api.GetSystemMetrics(win32con.SM_XVIRTUALSCREEN)
+            top = win32api.GetSystemMetrics(win32con.SM_YVIRTUALSCREEN)
+
+        # ---- DXGI 快路径 ----
+        camera = _get_dx_camera()
+        if camera is not None:
+            try:
+                frame = camera.grab(region=(left, top, left + width, top + height))
+                if frame is not None:  # 屏幕无更新时 grab 返回 None，走 GDI 兜底
+                    if gray:
+                        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                    return frame
+            except Exception as e:
+                logger.debug(f"DXcam 截图失败，本帧回退 GDI: {e}")
 
-            if region:
-                left, top, width, height = region
-            else:
-                width = win32api.GetSystemMetrics(win32con.SM_CXVIRTUALSCREEN)
-                height = win32api.GetSystemMetrics(win32con.SM_CYVIRTUALSCREEN)
-                left = win32api.GetSystemMetrics(win32con.SM_XVIRTUALSCREEN)
-                top = win32api.GetSystemMetrics(win32con.SM_YVIRTUALSCREEN)
-
-            hwindc = win32gui.GetWindowDC(hwin)
-            srcdc = win32ui.CreateDCFromHandle(hwindc)
-            memdc = srcdc.CreateCompatibleDC()
-            bmp = win32ui.CreateBitmap()
-            bmp.CreateCompatibleBitmap(srcdc, width, height)
-            memdc.SelectObject(bmp)
-            memdc.BitBlt((0, 0), (width, height), srcdc, (left, top), win32con.SRCCOPY)
-
-            # 转换为 numpy 数组
-            signed_ints = bmp.GetBitmapBits(True)
-            img = np.frombuffer(signed_ints, dtype='uint8')
-            img.shape = (height, width, 4)
-
-            srcdc.DeleteDC()
-            memdc.DeleteDC()
-            win32gui.ReleaseDC(hwin, hwindc)
-            win32gui.DeleteObject(bmp.GetHandle())
-
-            return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+        # ---- GDI 兜底路径 ----
+        try:
+            with self._gdi_lock:
+                entry = self._gdi_cache.get((width, height))
+                if entry is None:
+                    # 首次/尺寸变化：创建并缓存全套 GDI 对象 + DIB section
+                    hwin = win32gui.GetDesktopWindow()
+                    hwindc = win32gui.GetWindowDC(hwin)
+                    srcdc = win32ui.CreateDCFromHandle(hwindc)
+                    memdc = srcdc.CreateCompatibleDC()
+                    hbmp, dib_arr = _create_dib_section(hwindc, width, height)
+                    ctypes.windll.gdi32.SelectObject(
+                        ctypes.c_void_p(memdc.GetSafeHdc()),
+                        ctypes.c_void_p(hbmp))
+                    entry = (hwin, hwindc, srcdc, memdc, hbmp, dib_arr)
+                    self._gdi_cache[(width, height)] = entry
+
+                hwin, hwindc, srcdc, memdc, hbmp, img = entry
+                memdc.BitBlt((0, 0), (width, height), srcdc,
+                             (left, top), win32con.SRCCOPY)
+                # BitBlt 直接写进 DIB 内存；Flush 后 img 即为最新 BGRA 帧
+                ctypes.windll.gdi32.GdiFlush()
+
+                # 写入按尺寸复用的输出缓冲，稳态下零新分配
+                key = (height, width, bool(gray))
+                buf = self._frame_bufs.get(key)
+                if buf is None:
+                    shape = (height, width) if gray else (height, width, 3)
+                    buf = np.empty(shape, dtype=np.uint8)
+                    self._frame_bufs[key] = buf
+                code = cv2.COLOR_BGRA2GRAY if gray else cv2.COLOR_BGRA2BGR
+                cv2.cvtColor(img, code, dst=buf)
+                return buf
         except Exception as e:
             logger.error(f"截图失败: {e}")
             return None
 
+    def _release_gdi_cache(self):
+        """释放缓存的 GDI 内核对象（进程退出时调用）"""
+        with self._gdi_lock:
+            for hwin, hwindc, srcdc, memdc, hbmp, _ in self._gdi_cache.values():
+                try:
+                    srcdc.DeleteDC()
+                    memdc.DeleteDC()
+                    win32gui.ReleaseDC(hwin, hwindc)
+                    win32gui.DeleteObject(hbmp)
+                except Exception:
+                    pass
+            self._gdi_cache.clear()
+
     # ========== 布局检测 ==========
 
     # ========== 布局检测 (Icon-Based V12) ==========
@@ -163,8 +439,30 @@ class AppReader:
         if img is None:
             return None
 
-        h, w = img.shape[:2]
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+        # 四个信号的定位精度要求都在 ~5px 量级，半分辨率足够：
+        # pyrDown 后像素流量降 4×（这些扫描都是带宽受限的）
+        if min(gray.shape[:2]) >= 500:
+            small = cv2.pyrDown(gray)
+            result = self._detect_layout_gray(small)
+            if result is None:
+                return None
+            sx = gray.shape[1] / small.shape[1]
+            sy = gray.shape[0] / small.shape[0]
+            cl_w, t_h, i_y, cr_w = result
+            return (int(cl_w * sx), int(t_h * sy),
+                    int(i_y * sy), int(cr_w * sx))
+
+        return self._detect_layout_gray(gray)
+
+    def _detect_layout_gray(self, gray):
+        """在灰度图上执行实际的布局扫描（可能是半分辨率）"""
+        h, w = gray.shape[:2]
+
+        # 整幅竖直差分只做一次：标题栏/输入框（含右面板触发的二次扫描）
+        # 都从这里切列，避免对重叠区域重复 absdiff
+        vdiff = cv2.absdiff(gray[1:, :], gray[:-1, :])
 
         # 默认回退值（始终可用）
         default_cl_w = int(w * self.config.chatlist_default_pct)
@@ -182,19 +480,24 @@ class AppReader:
         if chat_x_max <= chat_x_min + chat_k + 2:
             return default_cl_w, default_t_h, default_i_y, default_cr_w
 
-        gray_f = gray.astype(np.float32)
-        chat_scores = []
-        for x in range(chat_x_min, chat_x_max):
-            if x - chat_k < 0 or x + chat_k + 1 >= w:
-                chat_scores.append(0.0)
-                continue
-            left_mean = gray_f[chat_band_y1:chat_band_y2, x - chat_k:x].mean()
-            right_mean = gray_f[chat_band_y1:chat_band_y2, x + 1:x + chat_k + 1].mean()
-            chat_scores.append(abs(float(left_mean - right_mean)))
-
-        chat_scores = np.array(chat_scores, dtype=np.float32)
+        # 列前缀和：每个候选 x 的左右均值差变成 O(1) 减法，整段扫描向量化
+        band_h = chat_band_y2 - chat_band_y1
+        col_sum = gray[chat_band_y1:chat_band_y2, :].sum(axis=0, dtype=np.float64)
+        csum = np.concatenate(([0.0], np.cumsum(col_sum)))
+
+        xs = np.arange(chat_x_min, chat_x_max)
+        valid = (xs - chat_k >= 0) & (xs + chat_k + 1 < w)
+        xs_l = np.clip(xs - chat_k, 0, w)
+        xs_r = np.clip(xs + chat_k + 1, 0, w)
+        left_sum = csum[xs] - csum[xs_l]          # [x-k, x)
+        right_sum = csum[xs_r] - csum[xs + 1]     # [x+1, x+k+1)
+        chat_scores = np.where(
+            valid,
+            np.abs(left_sum - right_sum) / (chat_k * band_h),
+            0.0,
+        ).astype(np.float32)
         if len(chat_scores) > 9:
-            chat_scores = np.convolve(chat_scores, np.ones(9) / 9.0, mode='same')
+            chat_scores = _smooth1d(chat_scores, 9)
         rel_idx = int(np.argmax(chat_scores))
         cl_w = chat_x_min + rel_idx
 
@@ -212,13 +515,12 @@ class AppReader:
         if title_x2 <= title_x1 + 10:
             t_h = default_t_h
         else:
-            row_diff = np.abs(
-                gray_f[1:, title_x1:title_x2] - gray_f[:-1, title_x1:title_x2]
-            )
+            # uint8 差分 + partition 选序统计量：不升格 float32，
+            # 带宽降到 1/4 且免去整行排序
             # 用中位数抑制局部文字/头像尖峰
-            row_score = np.median(row_diff, axis=1)
+            row_score = _row_order_stat(vdiff[:, title_x1:title_x2], 0.5)
             if len(row_score) > 7:
-                row_score = np.convolve(row_score, np.ones(7) / 7.0, mode='same')
+                row_score = _smooth1d(row_score, 7)
 
             y1 = int(h * 0.03)
             y2 = int(h * 0.20)
@@ -240,13 +542,10 @@ class AppReader:
         content_x2 = max(content_x1 + 20, w - 10)
         cr_w = 0
 
-        row_diff_main = np.abs(
-            gray_f[1:, content_x1:content_x2] - gray_f[:-1, content_x1:content_x2]
-        )
         # 使用上分位统计，突出“连续线”而非局部字符
-        row_score_main = np.percentile(row_diff_main, 75, axis=1)
+        row_score_main = _row_order_stat(vdiff[:, content_x1:content_x2], 0.75)
         if len(row_score_main) > 9:
-            row_score_main = np.convolve(row_score_main, np.ones(9) / 9.0, mode='same')
+            row_score_main = _smooth1d(row_score_main, 9)
 
         iy1 = int(h * 0.55)
         iy2 = int(h * 0.94)
@@ -269,23 +568,30 @@ class AppReader:
         best_rp_score = 0.0
         best_rp_diffs = None
 
-        for x in range(rp_x_min, rp_x_max):
-            if x - rp_k < 0 or x + rp_k + 1 >= w:
-                continue
-
-            diffs = []
+        # 每个条带一次 SIMD 列求和 + 前缀和：左右均值差化为 O(1) 减法，
+        # 只触达三个条带的像素（比整幅积分图省一半以上带宽）
+        rp_xs = np.arange(rp_x_min, rp_x_max)
+        rp_xs = rp_xs[(rp_xs - rp_k >= 0) & (rp_xs + rp_k + 1 < w)]
+        if rp_xs.size > 0:
+            band_diffs = []
             for a, b in ((0.20, 0.35), (0.35, 0.55), (0.55, 0.72)):
                 y1 = int(h * a)
                 y2 = int(h * b)
-                left_m = gray_f[y1:y2, x - rp_k:x].mean()
-                right_m = gray_f[y1:y2, x + 1:x + rp_k + 1].mean()
-                diffs.append(abs(float(left_m - right_m)))
-
-            score = min(diffs) * 0.7 + (sum(diffs) / len(diffs)) * 0.3
-            if score > best_rp_score:
-                best_rp_score = score
-                best_rp_x = x
-                best_rp_diffs = diffs
+                area = rp_k * (y2 - y1)
+                col = cv2.reduce(gray[y1:y2, :], 0, cv2.REDUCE_SUM,
+                                 dtype=cv2.CV_32S).ravel()
+                csum = np.concatenate(([0], np.cumsum(col, dtype=np.int64)))
+                left_m = (csum[rp_xs] - csum[rp_xs - rp_k]) / area
+                right_m = (csum[rp_xs + rp_k + 1] - csum[rp_xs + 1]) / area
+                band_diffs.append(np.abs(left_m - right_m))
+
+            band_diffs = np.stack(band_diffs)  # (3, N)
+            rp_scores = band_diffs.min(axis=0) * 0.7 + band_diffs.mean(axis=0) * 0.3
+            best_idx = int(np.argmax(rp_scores))
+            if rp_scores[best_idx] > 0.0:
+                best_rp_score = float(rp_scores[best_idx])
+                best_rp_x = int(rp_xs[best_idx])
+                best_rp_diffs = band_diffs[:, best_idx].tolist()
 
         if best_rp_x is not None:
             panel_w = w - best_rp_x
@@ -299,12 +605,10 @@ class AppReader:
         # 右侧面板存在时重新约束输入区域，避免把成员面板滚动条识别进来
         if cr_w > 0:
             content_x2 = max(content_x1 + 20, w - cr_w - 5)
-            row_diff_main = np.abs(
-                gray_f[1:, content_x1:content_x2] - gray_f[:-1, content_x1:content_x2]
-            )
-            row_score_main = np.percentile(row_diff_main, 75, axis=1)
+            # 直接对缓存的差分图重新切列，不重做 absdiff
+            row_score_main = _row_order_stat(vdiff[:, content_x1:content_x2], 0.75)
             if len(row_score_main) > 9:
-                row_score_main = np.convolve(row_score_main, np.ones(9) / 9.0, mode='same')
+                row_score_main = _smooth1d(row_score_main, 9)
             seg = row_score_main[iy1:iy2]
             threshold = np.median(seg) + np.std(seg) * 1.0
             strong = np.where(seg >= threshold)[0]
@@ -325,11 +629,11 @@ class AppReader:
 
     # ========== 聊天区域截图 ==========
 
-    def get_chat_area_screenshot(self):
+    def _chat_roi_region(self):
         """
-        截取聊天消息区域（排除侧边栏、标题栏、输入框）。
+        计算聊天消息区域的屏幕坐标（排除侧边栏、标题栏、输入框）。
         窗口尺寸变化时自动重新检测布局。
-        :return: BGR numpy array 或 None
+        :return: (left, top, width, height) 或 None
         """
         result = self.get_window_rect()
         if not result:
@@ -344,10 +648,18 @@ class AppReader:
         if self._last_window_rect is None or \
            abs(w - self._last_window_rect[2]) > 5 or \
            abs(h - self._last_window_rect[3]) > 5:
-            logger.info("窗口尺寸变化，重新计算布局...")
-            full_img = self.capture_screen((x1, y1, w, h))
-            if full_img is not None:
-                self._layout_params = self.detect_layout(full_img)
+            cached = self._layout_cache.get((w, h))
+            if cached is not None:
+                logger.debug(f"窗口尺寸变化，命中布局缓存: {w}x{h}")
+                self._layout_params = cached
+            else:
+                logger.info("窗口尺寸变化，重新计算布局...")
+                # 布局检测只看灰度，直接抓单通道帧
+                full_img = self.capture_screen((x1, y1, w, h), gray=True)
+                if full_img is not None:
+                    self._layout_params = self.detect_layout(full_img)
+                    if self._layout_params is not None:
+                        self._layout_cache[(w, h)] = self._layout_params
             self._last_window_rect = (x1, y1, w, h)
 
         # 应用布局参数（百分比回退值）
@@ -367,7 +679,76 @@ class AppReader:
         if roi_w <= 50 or roi_h <= 50:
             return None
 
-        return self.capture_screen((roi_x, roi_y, roi_w, roi_h))
+        return roi_x, roi_y, roi_w, roi_h
+
+    def _ensure_grab_thread(self):
+        """懒启动抓帧线程：首次请求截图前不占任何后台资源"""
+        if self._grab_thread is None:
+            with self._grab_thread_lock:
+                if self._grab_thread is None:
+                    self._grab_thread = threading.Thread(
+                        target=self._grab_loop, daemon=True)
+                    self._grab_thread.start()
+
+    def _grab_loop(self):
+        """后台抓帧循环：每次被唤醒抓一帧入单槽队列，无需求时休眠"""
+        while not self._grab_stop.is_set():
+            self._grab_wake.wait()
+            if self._grab_stop.is_set():
+                break
+            self._grab_wake.clear()
+            region = self._chat_roi_region()
+            img = self.capture_screen(region) if region else None
+            if img is None:
+                # 窗口不可见/截图失败：不自旋重试，等下一次唤醒
+                continue
+            # 丢旧保新：消费慢时覆盖旧帧而不是阻塞抓帧。
+            # capture_screen 的 GDI 路径按尺寸复用输出缓冲，下一次
+            # 同尺寸抓取会原地覆写——跨线程交接必须脱离缓冲池，
+            # 否则消费方还在哈希/OCR 时帧就被撕裂
+            if self._frame_queue.full():
+                try:
+                    self._frame_queue.get_nowait()
+                except queue.Empty:
+                    pass
+            self._frame_queue.put((time.time(), img.copy()))
+
+    def stop(self):
+        """停止后台抓帧线程"""
+        self._grab_stop.set()
+        self._grab_wake.set()
+
+    def get_chat_area_screenshot(self):
+        """
+        获取聊天消息区域截图。抓帧节奏跟随消费节奏：活跃轮询时
+        上一轮预取的帧直接可用（捕获与 OCR 重叠），预取帧过旧
+        （空闲退避期间）则现场补抓一帧，保证内容新鲜。
+        :return: BGR numpy array 或 None
+        """
+        self._ensure_grab_thread()
+        try:
+            ts, img = self._frame_queue.get_nowait()
+        except queue.Empty:
+            ts, img = 0.0, None
+
+        if img is None or time.time() - ts > 1.0:
+            # 无预取帧或帧过旧：唤醒抓帧线程要一帧新的
+            self._grab_wake.set()
+            try:
+                ts, img = self._frame_queue.get(timeout=1.0)
+            except queue.Empty:
+                # 后台线程未能供帧（窗口刚消失/尚未就绪），退化为
+                # 同步截取。同样 copy 脱离复用缓冲：抓帧线程随后的
+                # 同尺寸捕获会原地覆写池中数组
+                region = self._chat_roi_region()
+                if region is None:
+                    return None
+                sync = self.capture_screen(region)
+                return None if sync is None else sync.copy()
+
+        # 预取下一帧：与调用方接下来的哈希/OCR 重叠
+        self._grab_wake.set()
+        return img
 
     # ========== 标题栏识别（联系人名称） ==========
 
@@ -406,30 +787,33 @@ class AppReader:
         if title_img is None:
             return None
 
+        # 标题栏像素没变就直接复用上次的联系人结果，跳过 OCR
+        title_hash = _thumb_hash(title_img)
+        if title_hash == self._last_title_hash:
+            return self._last_contact
+        self._last_title_hash = title_hash
+        self._last_contact = None
+
         ocr_result, _ = self.ocr_engine(title_img)
         if not ocr_result:
             return None
 
+        # 全部框一次性转 NumPy，min/max/面积按轴向量化
+        boxes_np = np.asarray([item[0] for item in ocr_result], dtype=np.float32)
+        min_xy = boxes_np.min(axis=1)
+        max_xy = boxes_np.max(axis=1)
+        areas = (max_xy - min_xy).prod(axis=1)
+
         # 过滤系统按钮文字和路径/代码特征
-        system_words = {"最小化", "最大化", "关闭", "—", "×", "□", "一", "X"}
-        code_pattern = re.compile(
-            r'[.](py|js|txt|md|bat|exe|json|csv|xml|html|cpp|java|go)'
-            r'|[\\/\>:]|\bsrc\b|\bdef\b|\bclass\b|\bimport\b'
-        )
         candidates = []
-        for item in ocr_result:
+        for i, item in enumerate(ocr_result):
             text = item[1].strip()
-            box = item[0]
-            if text in system_words or len(text) < 1:
+            if text in _SYSTEM_WORDS or len(text) < 1:
                 continue
-            if code_pattern.search(text):
+            if _CODE_PATTERN.search(text):
                 logger.debug(f"标题栏过滤代码/路径特征: {text}")
                 continue
-            # 计算文本块面积
-            xs = [p[0] for p in box]
-            ys = [p[1] for p in box]
-            area = (max(xs) - min(xs)) * (max(ys) - min(ys))
-            candidates.append((text, area))
+            candidates.append((text, float(areas[i])))
 
         if not candidates:
             return None
@@ -437,6 +821,7 @@ class AppReader:
         # 取面积最大的（通常是联系人名称）
         best = max(candidates, key=lambda c: c[1])
         contact_name = best[0]
+        self._last_contact = contact_name
         logger.debug(f"识别到联系人: {contact_name}")
         return contact_name
 
@@ -451,39 +836,56 @@ class AppReader:
         if img is None:
             return []
 
+        # 聊天区像素没变就复用上次的合并结果，跳过 OCR
+        chat_hash = _thumb_hash(img)
+        if chat_hash == self._last_chat_hash:
+            return self._last_messages
+
         height, width, _ = img.shape
 
-        ocr_result, _ = self.ocr_engine(img)
+        # 高分屏 ROI 降采样到规范高度后再推理，框坐标按比例还原
+        scale = min(1.0, _OCR_TARGET_HEIGHT / height)
+        if scale < 1.0:
+            dsize = (int(width * scale), int(height * scale))
+            buf = self._ocr_input_buf
+            if buf is None or buf.shape[:2] != (dsize[1], dsize[0]):
+                buf = np.empty((dsize[1], dsize[0], 3), dtype=img.dtype)
+                self._ocr_input_buf = buf
+            ocr_img = cv2.resize(img, dsize, dst=buf,
+                                 interpolation=cv2.INTER_AREA)
+        else:
+            ocr_img = img
+
+        ocr_result, _ = self.ocr_engine(ocr_img)
 
         raw_messages = []
         if ocr_result:
-            for item in ocr_result:
-                text = item[1]
-                conf = item[2]
-                box = item[0]
-
-                xs = [p[0] for p in box]
-                avg_x = sum(xs) / len(xs)
-
-                # 根据水平位置判断角色 (基于相对宽度)
-                # 左侧 35% 为 Other, 右侧 65% 为 Self, 中间为 System
-                rel_x = avg_x / width
-                if rel_x < 0.35:
-                    role = "Other"
-                elif rel_x > 0.65:
-                    role = "Self"
-                else:
-                    role = "System"
-
-                if conf > 0.60: # 稍微降低置信度阈值以捕获更多内容
-                    raw_messages.append({
-                        "role": role,
-                        "text": text,
-                        "conf": conf,
-                        "box": box
-                    })
-
-        return self.merge_messages(raw_messages)
+            # 坐标整体转 NumPy：还原缩放与均值计算全部向量化
+            boxes_np = np.asarray([item[0] for item in ocr_result],
+                                  dtype=np.float32)
+            if scale < 1.0:
+                boxes_np *= np.float32(1.0 / scale)
+
+            # 角色判定与置信度过滤整体向量化，Python 循环只剩组装字典
+            rel_x = boxes_np[:, :, 0].mean(axis=1) / width
+            role_idx = np.where(rel_x < _ROLE_BOUNDARY_LOW, 0,
+                                np.where(rel_x > _ROLE_BOUNDARY_HIGH, 1, 2))
+            conf_arr = np.asarray([item[2] for item in ocr_result],
+                                  dtype=np.float32)
+            # 稍微降低置信度阈值以捕获更多内容
+            for i in np.flatnonzero(conf_arr > 0.60):
+                item = ocr_result[i]
+                raw_messages.append({
+                    "role": _ROLE_NAMES[role_idx[i]],
+                    "text": item[1],
+                    "conf": item[2],
+                    "box": boxes_np[i]
+                })
+
+        merged = self.merge_messages(raw_messages)
+        self._last_chat_hash = chat_hash
+        self._last_messages = merged
+        return merged
 
     # ========== 消息合并 ==========
 
@@ -491,41 +893,38 @@ class AppReader:
         """
         合并属于同一消息气泡的相邻文本块。
         规则：相同角色 + 垂直距离小于1.5倍行高 → 合并
+        坐标/角色拆成类型化数组（SoA），分组扫描在 C 速度执行。
         """
         if not raw_msgs:
             return []
 
+        # SoA：顶/底 Y 坐标与角色编号
+        top_y = np.array([m['box'][0][1] for m in raw_msgs], dtype=np.float32)
+        bot_y = np.array([m['box'][2][1] for m in raw_msgs], dtype=np.float32)
+        role_ids = {}
+        roles = np.empty(len(raw_msgs), dtype=np.int8)
+        for i, m in enumerate(raw_msgs):
+            roles[i] = role_ids.setdefault(m['role'], len(role_ids))
+
         # 按 Y 坐标排序（从上到下）
-        raw_msgs.sort(key=lambda m: m['box'][0][1])
+        order = np.argsort(top_y, kind='stable')
+        groups = _merge_group_ids(top_y[order], bot_y[order], roles[order])
 
+        # 按组号拼接文本（每组首块提供 role/box 左上，末块提供 box 右下）
         merged = []
         current = None
-
-        for msg in raw_msgs:
-            if current is None:
+        last_gid = -1
+        for gid, idx in zip(groups, order):
+            msg = raw_msgs[idx]
+            if gid != last_gid:
+                merged.append(msg)
                 current = msg
+                last_gid = gid
                 continue
-
-            if msg['role'] == current['role']:
-                # 计算垂直距离
-                y1 = current['box'][2][1]  # 当前消息底部 Y
-                y2 = msg['box'][0][1]      # 新消息顶部 Y
-                line_h = y1 - current['box'][0][1]  # 当前行高
-                distance = y2 - y1
-
-                if distance < line_h * 1.5:
-                    # 合并
-                    current['text'] += " " + msg['text']
-                    current['conf'] = min(current['conf'], msg['conf'])
-                    current['box'][2] = msg['box'][2]
-                    current['box'][3] = msg['box'][3]
-                    continue
-
-            merged.append(current)
-            current = msg
-
-        if current:
-            merged.append(current)
+            current['text'] += " " + msg['text']
+            current['conf'] = min(current['conf'], msg['conf'])
+            current['box'][2] = msg['box'][2]
+            current['box'][3] = msg['box'][3]
 
         return merged
 
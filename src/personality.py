@@ -33,7 +33,9 @@ class PersonalityEngine:
         if not chat_history:
             return
         
-        last_msg = chat_history[-1]['text']
+        last = chat_history[-1]
+        # 兼容 message_utils.Msg 与旧式字典
+        last_msg = last.text if hasattr(last, 'text') else last['text']
         if len(last_msg) > 50:
             self.current_mood = "吐槽"
         elif "?" in last_msg or "？" in last_msg:
@@ -41,6 +43,10 @@ class PersonalityEngine:
         else:
             self.current_mood = random.choice(self.moods)
 
+    def state_signature(self):
+        """影响人格描述输出的内部状态签名（用于上层缓存）"""
+        return (self.current_mood, self.silent_rounds)
+
     def get_personality_prompt(self):
         """获取注入到 System Prompt 的人格描述"""
         traits_str = "、".join(self.traits)
@@ -2,9 +2,10 @@
 Pry 弹窗通知模块 — 统一暗色主题、自适应尺寸、智能显示时长
 """
 import tkinter as tk
-import queue
+from tkinter import font as tkfont
 import time
 import ctypes
+import atexit
 import os
 import re
 from PIL import Image
@@ -43,6 +44,9 @@ ACTION_LABELS = {
     "warn":    "⚠️ 风险预警",
 }
 
+# 标题文本缓存：未知 action 的兜底格式化只做一次，后续直接查表
+_LABEL_CACHE = dict(ACTION_LABELS)
+
 # 弹窗参数
 POPUP_WIDTH = 380
 POPUP_MIN_HEIGHT = 70
@@ -53,6 +57,29 @@ FONT_FAMILY = "Microsoft YaHei UI"
 FONT_SIZE_TITLE = 10
 FONT_SIZE_BODY = 11
 
+# 淡入 alpha 时间轴（步长 0.06，封顶 0.95）：预计算一次，全部弹窗共用
+_FADE_IN_ALPHAS = tuple(
+    min(0.06 * i, 0.95) for i in range(1, 17)
+)
+
+# 低端环境直接跳过 alpha 动画：DWM 合成关闭时每次 -alpha 都触发
+# 整窗重绘（约 32 次/弹窗），逐帧淡入反而更卡；核数过少同理
+try:
+    _dwm_enabled = ctypes.c_int()
+    ctypes.windll.dwmapi.DwmIsCompositionEnabled(ctypes.byref(_dwm_enabled))
+    ANIM_DISABLED = not _dwm_enabled.value
+except Exception:
+    ANIM_DISABLED = False
+if not ANIM_DISABLED and (os.cpu_count() or 4) < 4:
+    ANIM_DISABLED = True
+
+# 托盘图标：路径计算和 .ico 解码只在模块导入时做一次
+_ICO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pry.ico")
+if os.path.exists(_ICO_PATH):
+    _TRAY_IMG = Image.open(_ICO_PATH).copy()
+else:
+    _TRAY_IMG = Image.new('RGB', (64, 64), color=(15, 52, 96))
+
 
 class PopupWindow:
     def __init__(self):
@@ -61,26 +88,78 @@ class PopupWindow:
         self.root.attributes("-topmost", True)
         self.root.overrideredirect(True)
 
-        self.queue = queue.Queue()
         self._current_popup = None  # 当前活跃弹窗引用
         self._fade_out_id = None   # 当前自动关闭的 after id
+        self._popup = None         # 常驻复用的 Toplevel（首次显示时构建）
+        self._alpha_after_id = None  # 当前 alpha 动画的 after id
+
+        # 突发合并：250ms 内的连续 show 只保留最新一条
+        self._last_show_ts = 0.0
+        self._pending_after_id = None
+
+        # 进度条动画集中调度：一个 ticker 驱动全部活跃动画
+        self._progress_anims = []
+        self._ticker_running = False
+
+        # 共享字体对象：Tcl 对字体元组每次都要重新解析/解析 GDI 字体，
+        # Font 对象只在这里解析一次，之后按引用传递
+        self._f_title = tkfont.Font(family=FONT_FAMILY, size=FONT_SIZE_TITLE,
+                                    weight="bold")
+        self._f_close = tkfont.Font(family=FONT_FAMILY, size=9)
+        self._f_body = tkfont.Font(family=FONT_FAMILY, size=FONT_SIZE_BODY)
+        self._f_small = tkfont.Font(family=FONT_FAMILY, size=8)
+
+        # 行高度量一次取好；正文字符宽度按需缓存（measure 是 Tcl 往返）
+        self._header_h = max(self._f_title.metrics("linespace"),
+                             self._f_close.metrics("linespace"))
+        self._body_line_h = self._f_body.metrics("linespace")
+        self._small_h = self._f_small.metrics("linespace")
+        self._char_w = {}
 
     # ========== 公开接口 ==========
 
     def show(self, action, content):
-        """主入口，将消息入队（线程安全）"""
-        self.queue.put({"action": action, "content": content})
+        """
+        主入口（线程安全）。Tk 控件不可跨线程操作，但 after 只是往
+        Tcl 事件队列追加回调，worker 线程可以直接调用——弹窗本身
+        仍在主循环里创建，且没有轮询的延迟下限。
+        250ms 内的连发只显示最新一条：被顶替的弹窗连 configure 都省了。
+        """
+        try:
+            now = time.monotonic()
+            since = now - self._last_show_ts
+            if since < 0.25:
+                # 抖动窗口内：取消更早的待显示消息，延迟到窗口结束再显示
+                if self._pending_after_id is not None:
+                    try:
+                        self.root.after_cancel(self._pending_after_id)
+                    except Exception:
+                        pass
+                self._pending_after_id = self.root.after(
+                    int((0.25 - since) * 1000),
+                    self._show_debounced, action, content)
+            else:
+                self._last_show_ts = now
+                self.root.after(0, self._create_popup, action, content)
+        except Exception:
+            # 主循环已退出（程序关闭中），丢弃该消息
+            pass
+
+    def _show_debounced(self, action, content):
+        """抖动窗口结束后显示幸存的最新消息"""
+        self._pending_after_id = None
+        self._last_show_ts = time.monotonic()
+        self._create_popup(action, content)
 
     def start(self):
         """启动 UI 主循环（必须在主线程调用）"""
         self._setup_tray()
-        self._run_loop()
         self.root.mainloop()
 
     # ========== 弹窗创建 ==========
 
     def _dismiss_current(self):
-        """立即销毁当前活跃弹窗"""
+        """立即隐藏当前活跃弹窗"""
         if self._current_popup and self._current_popup.winfo_exists():
             # 取消自动关闭定时器
             if self._fade_out_id:
@@ -89,17 +168,17 @@ class PopupWindow:
                 except Exception:
                     pass
                 self._fade_out_id = None
-            self._current_popup.destroy()
+            self._current_popup.withdraw()
         self._current_popup = None
 
-    def _create_popup(self, action, content):
-        """创建一个新弹窗，自动关闭旧弹窗"""
-        # 先关闭旧弹窗
-        self._dismiss_current()
-
-        label_text = ACTION_LABELS.get(action, f"💬 {action}")
-
+    def _build_popup(self):
+        """
+        只构建一次的常驻弹窗：Windows 上每次新建 Toplevel 要走 HWND
+        分配 + DWM 注册 + 字体度量（数十 ms），复用后每次显示只剩
+        几个 configure 调用。
+        """
         popup = tk.Toplevel(self.root)
+        popup.withdraw()
         popup.overrideredirect(True)
         popup.attributes("-topmost", True)
         popup.attributes("-alpha", 0.0)
@@ -117,17 +196,18 @@ class PopupWindow:
         header_frame = tk.Frame(card, bg=THEME["bg_card"])
         header_frame.pack(fill=tk.X)
 
-        tk.Label(
-            header_frame, text=label_text,
-            font=(FONT_FAMILY, FONT_SIZE_TITLE, "bold"),
+        header_label = tk.Label(
+            header_frame, text="",
+            font=self._f_title,
             bg=THEME["bg_card"], fg=THEME["fg_dim"],
             anchor="w"
-        ).pack(side=tk.LEFT)
+        )
+        header_label.pack(side=tk.LEFT)
 
         # 关闭按钮 ×
         close_btn = tk.Label(
             header_frame, text="✕",
-            font=(FONT_FAMILY, 9),
+            font=self._f_close,
             bg=THEME["bg_card"], fg=THEME["fg_dim"],
             cursor="hand2"
         )
@@ -139,22 +219,21 @@ class PopupWindow:
 
         # 内容文本
         content_label = tk.Label(
-            card, text=content,
-            font=(FONT_FAMILY, FONT_SIZE_BODY),
+            card, text="",
+            font=self._f_body,
             bg=THEME["bg_card"], fg=THEME["fg"],
             justify=tk.LEFT, anchor="nw",
             wraplength=POPUP_WIDTH - 36  # 减去两侧 padding
         )
         content_label.pack(fill=tk.BOTH, expand=True, anchor="nw")
 
-        # suggest 类型显示复制提示
-        if action == "suggest":
-            tk.Label(
-                card, text="点击复制",
-                font=(FONT_FAMILY, 8),
-                bg=THEME["bg_card"], fg=THEME["fg_dim"],
-                anchor="e"
-            ).pack(fill=tk.X, pady=(4, 0))
+        # suggest 类型的复制提示（按需 pack/pack_forget）
+        copy_hint = tk.Label(
+            card, text="点击复制",
+            font=self._f_small,
+            bg=THEME["bg_card"], fg=THEME["fg_dim"],
+            anchor="e"
+        )
 
         # 进度条（显示剩余时间）
         progress_frame = tk.Frame(card, bg=THEME["bg_card"], height=3)
@@ -162,44 +241,101 @@ class PopupWindow:
         progress_bar = tk.Frame(progress_frame, bg=THEME["highlight"], height=3)
         progress_bar.place(relwidth=1.0, relheight=1.0)
 
-        # ---- 计算自适应尺寸 ----
-        popup.update_idletasks()  # 让 tk 计算实际所需尺寸
-        needed_height = card.winfo_reqheight() + 2  # +2 for outer border
-        height = max(POPUP_MIN_HEIGHT, min(needed_height, POPUP_MAX_HEIGHT))
+        self._popup = popup
+        self._card = card
+        self._header_label = header_label
+        self._content_label = content_label
+        self._copy_hint = copy_hint
+        self._progress_frame = progress_frame
+        self._progress_bar = progress_bar
+
+    def _estimate_lines(self, text, wrap_w):
+        """按字符贪心估算折行后的行数（中文无词边界，Tk 也按字符折行）"""
+        measure = self._f_body.measure
+        char_w = self._char_w
+        lines = 1
+        line_w = 0
+        for ch in text:
+            if ch == "\n":
+                lines += 1
+                line_w = 0
+                continue
+            cw = char_w.get(ch)
+            if cw is None:
+                cw = char_w.setdefault(ch, measure(ch))
+            if line_w + cw > wrap_w:
+                lines += 1
+                line_w = cw
+            else:
+                line_w += cw
+        return lines
 
-        # ---- 定位：右下角 ----
-        screen_w = popup.winfo_screenwidth()
-        screen_h = popup.winfo_screenheight()
-        x = screen_w - POPUP_WIDTH - POPUP_MARGIN_RIGHT
-        y = screen_h - height - POPUP_MARGIN_BOTTOM
-        popup.geometry(f"{POPUP_WIDTH}x{height}+{x}+{y}")
+    def _create_popup(self, action, content):
+        """显示一条新消息（复用常驻弹窗），自动顶替旧弹窗"""
+        if self._popup is None:
+            self._build_popup()
+        popup = self._popup
+
+        # 先隐藏旧弹窗并取消其定时器
+        self._dismiss_current()
 
-        # ---- 点击复制功能 (suggest) ----
+        label_text = (_LABEL_CACHE.get(action)
+                      or _LABEL_CACHE.setdefault(action, f"💬 {action}"))
+        self._header_label.config(text=label_text)
+        self._content_label.config(text=content)
+
+        # ---- 点击行为：suggest 复制，其它直接关闭 ----
         if action == "suggest":
+            self._copy_hint.pack(fill=tk.X, pady=(4, 0),
+                                 before=self._progress_frame)
+
             def on_click(e):
                 try:
                     self.root.clipboard_clear()
                     self.root.clipboard_append(content)
-                    content_label.config(text="✅ 已复制到剪贴板")
+                    self._content_label.config(text="✅ 已复制到剪贴板")
                     popup.after(800, lambda: self._fade_out(popup))
                 except Exception:
                     pass
-
-            popup.bind("<Button-1>", on_click)
-            content_label.bind("<Button-1>", on_click)
-            card.bind("<Button-1>", on_click)
         else:
-            popup.bind("<Button-1>", lambda e: self._fade_out(popup))
+            self._copy_hint.pack_forget()
+
+            def on_click(e):
+                self._fade_out(popup)
+
+        # bind 默认替换旧回调，无需显式解绑
+        popup.bind("<Button-1>", on_click)
+        self._card.bind("<Button-1>", on_click)
+        self._content_label.bind("<Button-1>", on_click)
+
+        # ---- 计算自适应尺寸 ----
+        # 用字体度量估算高度，跳过 update_idletasks 的整个 idle 队列 flush
+        lines = self._estimate_lines(content, POPUP_WIDTH - 36)
+        # 外框 2 + 卡片上下 padding 24 + 标题行 + 分隔线区 17
+        # + 正文行 + 进度条区 11
+        needed_height = (2 + 24 + self._header_h + 17
+                         + lines * self._body_line_h + 11)
+        if action == "suggest":
+            needed_height += self._small_h + 4  # 复制提示行
+        height = max(POPUP_MIN_HEIGHT, min(needed_height, POPUP_MAX_HEIGHT))
+
+        # ---- 定位：右下角 ----
+        screen_w = popup.winfo_screenwidth()
+        screen_h = popup.winfo_screenheight()
+        x = screen_w - POPUP_WIDTH - POPUP_MARGIN_RIGHT
+        y = screen_h - height - POPUP_MARGIN_BOTTOM
+        popup.geometry(f"{POPUP_WIDTH}x{height}+{x}+{y}")
 
         # ---- 智能显示时长 ----
         # 基础 5 秒 + 每 20 个字符 +1 秒，最长 15 秒
         display_seconds = min(5 + len(content) // 20, 15)
         display_ms = display_seconds * 1000
 
-        # ---- 进度条动画 ----
-        self._animate_progress(progress_bar, display_ms)
-
-        # ---- 淡入 ----
+        # ---- 显示 + 动画 ----
+        popup.attributes("-alpha", 0.0)
+        self._progress_bar.place(relwidth=1.0, relheight=1.0)
+        popup.deiconify()
+        self._animate_progress(self._progress_bar, display_ms)
         self._fade_in(popup)
 
         # ---- 定时自动关闭 ----
@@ -210,86 +346,117 @@ class PopupWindow:
 
     # ========== 动画 ==========
 
-    def _fade_in(self, window):
-        """淡入动画"""
-        alpha = [0.0]
-
-        def step():
+    def _animate_alpha(self, window, schedule, on_done=None):
+        """
+        用单个 after 链按预计算的 alpha 时间轴播放动画。
+        每帧只有一次索引 + 一次 Tcl 调用，不再为每帧分配新闭包。
+        弹窗复用后同一窗口只允许一条动画链，新动画顶掉旧的。
+        """
+        if self._alpha_after_id is not None:
+            try:
+                window.after_cancel(self._alpha_after_id)
+            except Exception:
+                pass
+            self._alpha_after_id = None
+
+        set_alpha = window.attributes  # 缓存绑定方法，省每帧属性查找
+        state = {"i": 0}
+
+        def tick():
             if not window.winfo_exists():
                 return
-            if alpha[0] < 0.95:
-                alpha[0] += 0.06
-                window.attributes("-alpha", min(alpha[0], 0.95))
-                window.after(12, step)
+            set_alpha("-alpha", schedule[state["i"]])
+            state["i"] += 1
+            if state["i"] < len(schedule):
+                self._alpha_after_id = window.after(16, tick)
             else:
-                window.attributes("-alpha", 0.95)
+                self._alpha_after_id = None
+                if on_done is not None:
+                    on_done()
+
+        tick()
 
-        step()
+    def _fade_in(self, window):
+        """淡入动画"""
+        if ANIM_DISABLED:
+            window.attributes("-alpha", 0.95)
+            return
+        self._animate_alpha(window, _FADE_IN_ALPHAS)
 
     def _fade_out(self, window):
         """淡出动画"""
         if not window.winfo_exists():
             return
-        alpha = [float(window.attributes("-alpha"))]
-
-        def step():
-            if alpha[0] > 0.05:
-                alpha[0] -= 0.06
-                if window.winfo_exists():
-                    window.attributes("-alpha", max(alpha[0], 0.0))
-                    window.after(12, step)
-            else:
-                if window.winfo_exists():
-                    window.destroy()
-                if self._current_popup == window:
-                    self._current_popup = None
+        if ANIM_DISABLED:
+            window.withdraw()
+            if self._current_popup == window:
+                self._current_popup = None
+            return
+        alpha = float(window.attributes("-alpha"))
+        schedule = []
+        while alpha > 0.05:
+            alpha -= 0.06
+            schedule.append(max(alpha, 0.0))
+        schedule.append(0.0)
 
-        step()
+        def on_done():
+            if window.winfo_exists():
+                window.withdraw()
+            if self._current_popup == window:
+                self._current_popup = None
 
-    def _animate_progress(self, bar, total_ms):
-        """进度条从满到空动画"""
-        start_time = time.time()
-        total_s = total_ms / 1000.0
+        self._animate_alpha(window, schedule, on_done)
 
-        def step():
+    def _animate_progress(self, bar, total_ms):
+        """进度条从满到空动画：注册到集中 ticker"""
+        # 同一进度条重新显示时先移除旧动画条目
+        self._progress_anims = [a for a in self._progress_anims
+                                if a[0] is not bar]
+        # [bar, 开始时刻, 总时长秒, 上次像素宽]
+        self._progress_anims.append([bar, time.time(), total_ms / 1000.0, -1])
+        if not self._ticker_running:
+            self._ticker_running = True
+            self.root.after(33, self._tick_progress)
+
+    def _tick_progress(self):
+        """单定时器遍历全部进度动画；宽度不足 1px 变化时跳过重排"""
+        now = time.time()
+        alive = []
+        for anim in self._progress_anims:
+            bar, start, total_s, last_px = anim
             if not bar.winfo_exists():
-                return
-            elapsed = time.time() - start_time
-            ratio = max(0, 1.0 - elapsed / total_s)
-            bar.place(relwidth=ratio, relheight=1.0)
+                continue
+            ratio = max(0.0, 1.0 - (now - start) / total_s)
+            px = int(ratio * POPUP_WIDTH)
+            if px != last_px:
+                bar.place_configure(relwidth=ratio, relheight=1.0)
+                anim[3] = px
             if ratio > 0:
-                bar.after(50, step)
-
-        step()
+                alive.append(anim)
+        self._progress_anims = alive
+        if alive:
+            self.root.after(33, self._tick_progress)
+        else:
+            self._ticker_running = False
 
     # ========== 事件循环 ==========
 
-    def _run_loop(self):
-        """检测队列并处理显示"""
-        try:
-            while True:
-                msg = self.queue.get_nowait()
-                self._create_popup(msg["action"], msg["content"])
-        except queue.Empty:
-            pass
-        finally:
-            self.root.after(100, self._run_loop)
-
     # ========== 系统托盘 ==========
 
     def _setup_tray(self):
         """初始化系统托盘"""
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        ico_path = os.path.join(base_dir, "src", "pry.ico")
-
-        if os.path.exists(ico_path):
-            icon_img = Image.open(ico_path)
-        else:
-            icon_img = Image.new('RGB', (64, 64), color=(15, 52, 96))
+        icon_img = _TRAY_IMG
 
         def on_exit(icon, item):
             icon.stop()
             self.root.quit()
+            # os._exit 不走解释器的正常退出流程，atexit 钩子全被跳过，
+            # MemoryStore 延迟合并的最后一批更新会丢。先手动跑一遍钩子
+            # （其中就有 store.flush），再硬退。
+            try:
+                atexit._run_exitfuncs()
+            except Exception:
+                pass
             os._exit(0)
 
         menu = (
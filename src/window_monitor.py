@@ -37,27 +37,35 @@ class AIWorker:
         self.memory = memory
         self.popup = popup
         self._lock = threading.Lock()
-        self._busy = False
         self._pending = None
+        # 常驻消费线程：突发任务不再反复创建/销毁 OS 线程
+        self._wake = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
 
     def submit(self, chat_history, contact_name):
+        """
+        提交最新任务。chat_history 直接被引用而不拷贝——调用方
+        （monitor_loop）每轮都传入 normalize_messages 新建的列表，
+        提交后不得再修改它。
+        """
         with self._lock:
-            self._pending = (list(chat_history), contact_name)
-            if self._busy:
+            # 同一列表重复提交（指纹未变时的冗余调用）直接忽略
+            if self._pending is not None and self._pending[0] is chat_history:
                 return
-            self._busy = True
-        threading.Thread(target=self._run, daemon=True).start()
+            self._pending = (chat_history, contact_name)
+        self._wake.set()
 
     def _run(self):
         while True:
+            self._wake.wait()
+            self._wake.clear()
+
             with self._lock:
                 task = self._pending
                 self._pending = None
 
             if task is None:
-                with self._lock:
-                    self._busy = False
-                return
+                continue
 
             chat_history, contact_name = task
             start_time = time.time()
@@ -124,16 +132,28 @@ def monitor_loop(args, popup):
     last_fingerprint = None
     last_contact = None
 
+    # 自适应轮询：连续无变化时按指数退避（封顶 8s）少跑 OCR，
+    # 一有新消息立刻回到半个间隔，兼顾空闲开销与活跃时的新鲜度
+    idle_cycles = 0
+    # 跨轮缓存目标窗口句柄：稳态下每轮只剩 IsWindow/IsIconic 两个轻量调用
+    target_hwnd = None
+
+    def idle_sleep():
+        nonlocal idle_cycles
+        idle_cycles += 1
+        time.sleep(min(args.interval * (1.5 ** idle_cycles), 8.0))
+
     while True:
         try:
             # 0. 窗口状态检测：只要不是最小化就工作
-            target_hwnd = None
-            rect_result = reader.get_window_rect()
-            if rect_result:
-                target_hwnd = rect_result[1]
-            
+            if not (target_hwnd and win32gui.IsWindow(target_hwnd)):
+                target_hwnd = None
+                rect_result = reader.get_window_rect()
+                if rect_result:
+                    target_hwnd = rect_result[1]
+
             if not target_hwnd or win32gui.IsIconic(target_hwnd):
-                time.sleep(args.interval)
+                idle_sleep()
                 continue
 
             # 1. 读取消息
@@ -150,7 +170,7 @@ def monitor_loop(args, popup):
 
             # 去噪后无有效消息，跳过（不更新指纹）
             if not msgs:
-                time.sleep(args.interval)
+                idle_sleep()
                 continue
 
             logger.debug(f"OCR 识别耗时: {end_ocr - start_ocr:.2f}s, 有效消息: {len(msgs)} 条")
@@ -159,7 +179,7 @@ def monitor_loop(args, popup):
             current_fingerprint = fingerprint_messages(msgs)
 
             if current_fingerprint == last_fingerprint:
-                time.sleep(args.interval)
+                idle_sleep()
                 continue
 
             # 3. 识别联系人
@@ -173,18 +193,20 @@ def monitor_loop(args, popup):
             print(f"\n[{time.strftime('%H:%M:%S')}] 新消息 "
                   f"{'('+contact_name+')' if contact_name else ''}:")
             for m in msgs:
-                icon = "👤" if m['role'] == "Self" else "💬"
-                label = m['role']
-                if contact_name and m['role'] == "Other":
+                icon = "👤" if m.role == "Self" else "💬"
+                label = m.role
+                if contact_name and m.role == "Other":
                     label = contact_name
-                print(f"  {icon} [{label}] {m['text']}")
+                print(f"  {icon} [{label}] {m.text}")
 
             # 5. AI 分析 (单线程顺序处理，仅保留最新任务)
             if llm.client:
                 ai_worker.submit(msgs, contact_name)
 
             last_fingerprint = current_fingerprint
-            time.sleep(args.interval)
+            # 有新消息：重置退避并用更短的间隔跟进后续消息
+            idle_cycles = 0
+            time.sleep(max(0.5, args.interval / 2))
 
         except Exception:
             logger.exception("监控回路异常，将在下一轮继续")
@@ -1,10 +1,8 @@
-import json
-
 from src.memory_store import MemoryStore
 
 
 def test_update_contact_merges_and_increments(tmp_path):
-    memory_file = tmp_path / "memory.json"
+    memory_file = tmp_path / "memory.db"
     store = MemoryStore(str(memory_file))
 
     store.update_contact("Alice", {"relationship": "friend", "notes": "loves music"})
@@ -19,7 +17,7 @@ def test_update_contact_merges_and_increments(tmp_path):
 
 
 def test_update_user_profile_dedupes_topics(tmp_path):
-    memory_file = tmp_path / "memory.json"
+    memory_file = tmp_path / "memory.db"
     store = MemoryStore(str(memory_file))
 
     store.update_user_profile({"common_topics": ["AI", "music"]})
@@ -29,12 +27,11 @@ def test_update_user_profile_dedupes_topics(tmp_path):
     assert profile["common_topics"] == ["AI", "music", "sports"]
 
 
-def test_save_is_valid_json(tmp_path):
-    memory_file = tmp_path / "memory.json"
+def test_save_persists_across_instances(tmp_path):
+    memory_file = tmp_path / "memory.db"
     store = MemoryStore(str(memory_file))
     store.update_contact("Bob", {"relationship": "colleague"})
+    store.flush()  # 落盘是延迟合并的，重新打开前显式刷新
 
-    payload = json.loads(memory_file.read_text(encoding="utf-8"))
-    assert "contacts" in payload
-    assert payload["contacts"]["Bob"]["relationship"] == "colleague"
-
+    reloaded = MemoryStore(str(memory_file))
+    assert reloaded.get_contact("Bob")["relationship"] == "colleague"
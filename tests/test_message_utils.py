@@ -1,10 +1,24 @@
-from src.message_utils import fingerprint_messages, normalize_messages, normalize_text
+from src.message_utils import (
+    Msg,
+    fingerprint_messages,
+    is_semantic_message,
+    normalize_messages,
+    normalize_text,
+)
 
 
 def test_normalize_text_strips_spaces_and_zero_width():
     assert normalize_text("  a\u200b b  ") == "a b"
 
 
+def test_is_semantic_message_only_counts_decimal_digit_runs():
+    assert is_semantic_message("123")
+    assert is_semantic_message("１２３")  # 全角数字也是 Nd
+    # 带圈/上标数字不是十进制数字，等同符号，不凑数字串
+    assert not is_semantic_message("①②③")
+    assert not is_semantic_message("²³¹")
+
+
 def test_normalize_messages_filters_noise_and_system():
     raw = [
         {"role": "System", "text": "微信", "conf": 0.99},
@@ -14,8 +28,8 @@ def test_normalize_messages_filters_noise_and_system():
     ]
     cleaned = normalize_messages(raw, include_system=False)
     assert cleaned == [
-        {"role": "Other", "text": "好的", "conf": 0.95},
-        {"role": "Self", "text": "ok", "conf": 0.92},
+        Msg("Other", "好的", 0.95),
+        Msg("Self", "ok", 0.92),
     ]
 
 
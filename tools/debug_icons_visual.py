@@ -1,13 +1,14 @@
 import cv2
 import os
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 
 def read_image(path):
+    # np.fromfile handles non-ASCII paths itself (cv2.imread on Windows
+    # cannot), so no need for the extra open() + file-object indirection
     try:
-        with open(path, 'rb') as f:
-            bytes_data = np.fromfile(f, dtype=np.uint8)
-            img = cv2.imdecode(bytes_data, cv2.IMREAD_COLOR)
-        return img
+        buf = np.fromfile(path, dtype=np.uint8)
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR)
     except Exception:
         return None
 
@@ -27,19 +28,27 @@ def debug_visualize(img_path, output_path):
     
     tl_roi = gray[0:tl_y_end, 0:tl_x_end]
     tl_edges = cv2.Canny(tl_roi, 50, 150)
-    contours, _ = cv2.findContours(tl_edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    for c in contours:
-        x, y, cw, ch = cv2.boundingRect(c)
-        # Draw all contours in yellow
+    # connectedComponentsWithStats returns every bounding box in one C call,
+    # so the "Plus" criteria filter runs vectorized instead of per-contour
+    _, _, tl_stats, _ = cv2.connectedComponentsWithStats(
+        (tl_edges > 0).astype(np.uint8), connectivity=8)
+    tl_stats = tl_stats[1:]  # drop background label
+
+    # Draw all components in yellow
+    for x, y, cw, ch, _a in tl_stats:
         cv2.rectangle(debug_img, (x, y), (x+cw, y+ch), (0, 255, 255), 1)
-        
-        # Check if it passes "Plus" criteria
-        if 18 < cw < 60 and 18 < ch < 60 and 0.8 < cw/ch < 1.2:
-             if x > 150: 
-                 # Draw valid candidate in Green
-                 cv2.rectangle(debug_img, (x, y), (x+cw, y+ch), (0, 255, 0), 2)
-                 cv2.putText(debug_img, f"Plus?", (x, y-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+
+    ws = tl_stats[:, 2].astype(np.float32)
+    hs = np.maximum(tl_stats[:, 3], 1).astype(np.float32)
+    ratio = ws / hs
+    plus_mask = ((18 < tl_stats[:, 2]) & (tl_stats[:, 2] < 60)
+                 & (18 < tl_stats[:, 3]) & (tl_stats[:, 3] < 60)
+                 & (0.8 < ratio) & (ratio < 1.2)
+                 & (tl_stats[:, 0] > 150))
+    for x, y, cw, ch, _a in tl_stats[plus_mask]:
+        # Draw valid candidate in Green
+        cv2.rectangle(debug_img, (x, y), (x+cw, y+ch), (0, 255, 0), 2)
+        cv2.putText(debug_img, f"Plus?", (x, y-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
 
     # === Debug Toolbar ===
     # Draw horizontal projection
@@ -48,12 +57,15 @@ def debug_visualize(img_path, output_path):
     sobel_y = cv2.convertScaleAbs(cv2.Sobel(mid_roi, cv2.CV_64F, 0, 1))
     h_proj = np.mean(sobel_y, axis=1)
     
-    # Draw projection on the image
+    # Draw projection on the image: one fancy-indexed assignment instead of
+    # one cv2.line call (and Py<->C crossing) per ROI row
     base_x = w - 200
-    for i, val in enumerate(h_proj):
-        y = int(h*0.6) + i
-        length = int(val * 5)
-        cv2.line(debug_img, (base_x, y), (base_x + length, y), (0, 0, 255), 1)
+    base_y = int(h*0.6)
+    lengths = np.clip((h_proj * 5).astype(int), 0, w - base_x - 1)
+    if lengths.size > 0 and lengths.max() > 0:
+        cols = np.arange(lengths.max() + 1)
+        rows_idx, cols_idx = np.nonzero(cols[None, :] <= lengths[:, None])
+        debug_img[base_y + rows_idx, base_x + cols_idx] = (0, 0, 255)
 
     # Detect peaks
     peaks = np.where(h_proj > np.max(h_proj)*0.5)[0]
@@ -69,9 +81,9 @@ def debug_visualize(img_path, output_path):
             
             icon_roi = gray[check_y:check_y+50, cl_w:w]
             icon_edges = cv2.Canny(icon_roi, 50, 150)
-            cnts, _ = cv2.findContours(icon_edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            for c in cnts:
-                ix, iy, iw, ih = cv2.boundingRect(c)
+            _, _, icon_stats, _ = cv2.connectedComponentsWithStats(
+                (icon_edges > 0).astype(np.uint8), connectivity=8)
+            for ix, iy, iw, ih, _a in icon_stats[1:]:
                 abs_x = ix + cl_w
                 abs_y = iy + check_y
                 cv2.rectangle(debug_img, (abs_x, abs_y), (abs_x+iw, abs_y+ih), (0, 255, 255), 1) # Yellow Box = Icon Candidate
@@ -88,8 +100,11 @@ def main():
     output_dir = os.path.join(base_dir, 'debug_output')
     
     files = [f for f in os.listdir(data_dir) if f.startswith('调试材料') and f.endswith('.png')]
-    for f in files:
-        debug_visualize(os.path.join(data_dir, f), os.path.join(output_dir, f"debug_viz_{f}"))
+    in_paths = [os.path.join(data_dir, f) for f in files]
+    out_paths = [os.path.join(output_dir, f"debug_viz_{f}") for f in files]
+    # Each file is independent; fan the batch out across cores
+    with ProcessPoolExecutor() as ex:
+        list(ex.map(debug_visualize, in_paths, out_paths))
 
 if __name__ == "__main__":
     main()
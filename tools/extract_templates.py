@@ -2,6 +2,13 @@ import cv2
 import os
 import numpy as np
 
+def write_image(path, img, params=None):
+    # imencode + tofile: cv2.imwrite silently fails on non-ASCII paths
+    is_success, buffer = cv2.imencode(os.path.splitext(path)[1], img, params or [])
+    if is_success:
+        buffer.tofile(path)
+    return is_success
+
 def extract_templates():
     base_dir = os.path.join(os.path.dirname(__file__), '..')
     debug_dir = os.path.join(base_dir, 'debug_output')
@@ -11,11 +18,11 @@ def extract_templates():
     # Load one of the debug images (e.g., the first one)
     img_path = os.path.join(debug_dir, '调试材料1.png')
     
-    # Handle chinese path
+    # Handle chinese path: np.fromfile takes the path directly,
+    # no extra open() + file-object indirection needed
     try:
-        with open(img_path, 'rb') as f:
-            bytes_data = np.fromfile(f, dtype=np.uint8)
-            img = cv2.imdecode(bytes_data, cv2.IMREAD_COLOR)
+        bytes_data = np.fromfile(img_path, dtype=np.uint8)
+        img = cv2.imdecode(bytes_data, cv2.IMREAD_COLOR)
     except Exception as e:
         print(f"Failed to load image: {e}")
         return
@@ -39,8 +46,10 @@ def extract_templates():
     # Approx: x=240-280, y=30-70?
     # Let's crop a strip from the top-left sidebar
     plus_strip = img[20:80, 200:350] 
-    plus_path = os.path.join(template_dir, 'temp_plus_strip.png')
-    cv2.imwrite(plus_path, plus_strip)
+    # JPEG q85: the strips are for visual inspection only and encode
+    # 5-10x faster (and smaller) than PNG
+    plus_path = os.path.join(template_dir, 'temp_plus_strip.jpg')
+    write_image(plus_path, plus_strip, [cv2.IMWRITE_JPEG_QUALITY, 85])
     print(f"Saved Plus Strip to {plus_path}")
 
     # 2. Clock Icon Area (Input Toolbar)
@@ -55,8 +64,8 @@ def extract_templates():
     
     # Crop the whole toolbar strip
     toolbar_strip = img[toolbar_y_start:toolbar_y_end, :]
-    toolbar_path = os.path.join(template_dir, 'temp_toolbar_strip.png')
-    cv2.imwrite(toolbar_path, toolbar_strip)
+    toolbar_path = os.path.join(template_dir, 'temp_toolbar_strip.jpg')
+    write_image(toolbar_path, toolbar_strip, [cv2.IMWRITE_JPEG_QUALITY, 85])
     print(f"Saved Toolbar Strip to {toolbar_path}")
 
     # NOTE: Since I cannot see the GUI to select, I am saving strips.
@@ -68,10 +77,19 @@ def extract_templates():
     # Let's try to detect edges in the toolbar strip and find the rightmost blob.
     
     gray_toolbar = cv2.cvtColor(toolbar_strip, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray_toolbar, 50, 150)
-    
-    # Save edge map for debugging
-    cv2.imwrite(os.path.join(template_dir, 'toolbar_edges.png'), edges)
+    # Edge detection only localizes icon blobs, which survive aggressive
+    # downsampling — run Canny on a fixed 128x128 proxy (~20x fewer pixels
+    # on a 1920-wide strip). Any blob bbox found here maps back to the
+    # original strip via (scale_x, scale_y).
+    small = cv2.resize(gray_toolbar, (128, 128), interpolation=cv2.INTER_AREA)
+    scale_x = gray_toolbar.shape[1] / 128.0
+    scale_y = gray_toolbar.shape[0] / 128.0
+    edges = cv2.Canny(small, 50, 150)
+
+    # Save edge map for debugging (proxy resolution; coordinates in the
+    # map are small-image coords, multiply by scale_x/scale_y to recover
+    # positions in toolbar_strip)
+    write_image(os.path.join(template_dir, 'toolbar_edges.png'), edges)
     
 if __name__ == "__main__":
     extract_templates()
@@ -2,80 +2,97 @@ import sys
 import os
 import cv2
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from ocr_reader import AppReader
 
+BASE_DIR = os.path.join(os.path.dirname(__file__), '..')
+DEBUG_DIR = os.path.join(BASE_DIR, 'data', 'test_samples')
+OUTPUT_DIR = os.path.join(BASE_DIR, 'debug_output')
+
+# Per-process AppReader singleton: each pool worker builds its own reader
+# once on first task and reuses it for the rest of its batch
+_READER = None
+
+def _get_reader():
+    global _READER
+    if _READER is None:
+        from platform_config import WECHAT_CONFIG
+        _READER = AppReader(WECHAT_CONFIG)
+    return _READER
+
 def read_image(path):
+    # np.fromfile takes the path directly and handles non-ASCII names
+    # (cv2.imread on Windows cannot), no file-object roundtrip needed
     try:
-        with open(path, 'rb') as f:
-            bytes_data = np.fromfile(f, dtype=np.uint8)
-            img = cv2.imdecode(bytes_data, cv2.IMREAD_COLOR)
-        return img
-    except Exception as e:
+        bytes_data = np.fromfile(path, dtype=np.uint8)
+        return cv2.imdecode(bytes_data, cv2.IMREAD_COLOR)
+    except Exception:
         return None
 
+def _process_one(path):
+    """Analyze one sample image and return its log block."""
+    f = os.path.basename(path)
+    img = read_image(path)
+    if img is None:
+        return f"Failed to load {f}\n"
+
+    h, w = img.shape[:2]
+    lines = [f"Analyzing {f} ({w}x{h})\n"]
+
+    try:
+        layout = _get_reader().detect_layout(img)
+        if layout:
+            cl_w, t_h, i_y, cr_w = layout
+            lines.append(f"  ChatList (Blue): {cl_w} ({(cl_w/w)*100:.1f}%)\n")
+            lines.append(f"  RightPanel (Orange): {cr_w} ({(cr_w/w)*100:.1f}%)\n")
+            lines.append(f"  TitleH: {t_h}\n")
+            lines.append(f"  InputY: {i_y}\n")
+
+            # Draw lines and save debug image
+            annotated = img.copy()
+            # Blue Line (Chat List)
+            cv2.line(annotated, (cl_w, 0), (cl_w, h), (255, 255, 0), 2)
+            # Orange Line (Right Panel)
+            if cr_w > 0:
+                rx = w - cr_w
+                cv2.line(annotated, (rx, 0), (rx, h), (0, 165, 255), 2)
+            # Pink Line (Input Top)
+            cv2.line(annotated, (0, i_y), (w, i_y), (255, 0, 255), 2)
+            # Yellow Line (Title Bottom)
+            cv2.line(annotated, (0, t_h), (w, t_h), (0, 255, 255), 2)
+
+            filename = f"val_result_{f}"
+            output_path = os.path.join(OUTPUT_DIR, filename)
+            is_success, buffer = cv2.imencode(".png", annotated)
+            if is_success:
+                buffer.tofile(output_path)
+                lines.append(f"  Saved image: {filename}\n")
+        else:
+            lines.append("  Layout detection failed\n")
+    except Exception as e:
+        lines.append(f"  Error: {e}\n")
+    lines.append("-" * 20 + "\n")
+    return "".join(lines)
+
 def main():
-    base_dir = os.path.join(os.path.dirname(__file__), '..')
-    debug_dir = os.path.join(base_dir, 'data', 'test_samples')
-    output_dir = os.path.join(base_dir, 'debug_output')
-    
-    print(f"Scanning directory: {debug_dir}")
-    files = [f for f in os.listdir(debug_dir) if f.startswith('调试材料') and f.endswith('.png')]
-    
-    # Mock config
-    from platform_config import WECHAT_CONFIG
-    reader = AppReader(WECHAT_CONFIG)
-    
-    log_path = os.path.join(output_dir, "repro_log.txt")
-    
+    print(f"Scanning directory: {DEBUG_DIR}")
+    files = [f for f in os.listdir(DEBUG_DIR) if f.startswith('调试材料') and f.endswith('.png')]
+
+    log_path = os.path.join(OUTPUT_DIR, "repro_log.txt")
+
+    # Files are independent (decode + layout detection + re-encode is
+    # CPU-bound), so fan the batch out across cores; ex.map preserves
+    # input order so the log stays deterministic
+    paths = [os.path.join(DEBUG_DIR, f) for f in files]
     with open(log_path, "w", encoding="utf-8") as log:
-        for f in files:
-            path = os.path.join(debug_dir, f)
-            img = read_image(path)
-            if img is None:
-                log.write(f"Failed to load {f}\n")
-                continue
-                
-            h, w = img.shape[:2]
-            log.write(f"Analyzing {f} ({w}x{h})\n")
-            
-            try:
-                layout = reader.detect_layout(img)
-                if layout:
-                    cl_w, t_h, i_y, cr_w = layout
-                    log.write(f"  ChatList (Blue): {cl_w} ({(cl_w/w)*100:.1f}%)\n")
-                    log.write(f"  RightPanel (Orange): {cr_w} ({(cr_w/w)*100:.1f}%)\n")
-                    log.write(f"  TitleH: {t_h}\n")
-                    log.write(f"  InputY: {i_y}\n")
-                    
-                    # Draw lines and save debug image
-                    annotated = img.copy()
-                    # Blue Line (Chat List)
-                    cv2.line(annotated, (cl_w, 0), (cl_w, h), (255, 255, 0), 2)
-                    # Orange Line (Right Panel)
-                    if cr_w > 0:
-                        rx = w - cr_w
-                        cv2.line(annotated, (rx, 0), (rx, h), (0, 165, 255), 2)
-                    # Pink Line (Input Top)
-                    cv2.line(annotated, (0, i_y), (w, i_y), (255, 0, 255), 2)
-                    # Yellow Line (Title Bottom)
-                    cv2.line(annotated, (0, t_h), (w, t_h), (0, 255, 255), 2)
-                    
-                    filename = f"val_result_{f}"
-                    output_path = os.path.join(output_dir, filename)
-                    is_success, buffer = cv2.imencode(".png", annotated)
-                    if is_success:
-                        buffer.tofile(output_path)
-                        log.write(f"  Saved image: {filename}\n")
-                else:
-                    log.write("  Layout detection failed\n")
-            except Exception as e:
-                log.write(f"  Error: {e}\n")
-            log.write("-" * 20 + "\n")
-            
+        with ProcessPoolExecutor() as ex:
+            for block in ex.map(_process_one, paths):
+                log.write(block)
+
     print(f"Analysis complete. Log written to {log_path}")
 
 if __name__ == "__main__":